@@ -2,37 +2,168 @@
 
 import asyncio
 import datetime
+import hashlib
 import json
 import logging
+import os
 import uuid
 import re
 import gc
 import ctypes
 import platform
+from collections import OrderedDict
 import httpx
+import orjson
 from typing import List, Dict, Any, Optional
 from pathlib import Path
 
-from .prompts import SYSTEM_PROMPT, CODE_SYSTEM_PROMPT, SMART_MEMORY_PROMPT, PLANNING_SYSTEM_PROMPT, DBA_SYSTEM_PROMPT
+from .prompts import SYSTEM_PROMPT, CODE_SYSTEM_PROMPT, REQUEST_CONTEXT_PROMPT, render_prompt
+from .schemas import PLAN_UPDATE_FORMAT, CRITIC_VERDICT_FORMAT, MEMORY_SCORE_FORMAT, FINAL_ANSWER_FORMAT, LESSON_REPORT_FORMAT
 from .planning import TaskTree, TaskStatus
+from .llm_cache import LLMCache
+from .tool_cache import ToolResultCache
 from ..utils.logging import Icons, pretty_log, request_id_context
-from ..utils.token_counter import estimate_tokens
-from ..tools.registry import get_available_tools, TOOL_DEFINITIONS
+from ..utils.token_counter import estimate_tokens_cached
+from ..tools.registry import get_available_tools, TOOL_DEFINITIONS, TOOL_DEFINITIONS_JSON
 from ..tools.tasks import tool_list_tasks
 from ..memory.skills import SkillMemory
 
 logger = logging.getLogger("GhostAgent")
 
+_JSON_BLOCK_RE = re.compile(r'```(?:json)?\s*(\{.*?\})\s*```', re.DOTALL | re.IGNORECASE)
+_TOOL_CALL_RE = re.compile(r'<tool_call>.*?</tool_call>', re.DOTALL | re.IGNORECASE)
+_TOOL_CALL_JSON_RE = re.compile(r'<tool_call>\s*(\{.*?\})\s*</tool_call>', re.DOTALL | re.IGNORECASE)
+_EXIT_CODE_RE = re.compile(r"EXIT CODE:\s*(\d+)")
+_PREVIEW_RE = re.compile(r"(?:STDOUT/STDERR:|SYSTEM ERROR:)\s*(.{0,60})", re.DOTALL)
+_ARITH_RE = re.compile(r'^[\d\s\+\-\*\/\(\)\=\?]+$')
+
+def _substring_re(words: List[str]) -> re.Pattern:
+    return re.compile("|".join(map(re.escape, words)))
+
+# Intent routing vocabularies (matched as whole words, i.e. r"\bkw\b")
+_WORD_RE = re.compile(r"\w+")
+_CODING_KEYWORDS = frozenset({"python", "bash", "sh", "script", "code", "def", "import"})
+_CODING_ACTIONS = frozenset({"write", "run", "execute", "debug", "fix", "create", "generate", "count", "calculate", "analyze", "scrape", "plot", "graph"})
+_DBA_KEYWORDS = frozenset({"sql", "postgres", "postgresql", "psql", "database", "pg_stat", "query", "cte", "rdbms", "dba", "schema", "vacuum", "mvcc"})
+_DBA_PHRASE_RE = re.compile(r"\bexplain analyze\b")
+_META_KEYWORDS = frozenset({"title", "rename", "summary", "summarize", "caption", "describe"})
+_META_PHRASE_RE = re.compile(r"\bname this\b")
+_TRIVIAL_RE = re.compile(r"\b(?:who are you|hello|hi|hey there|how are you|what'?s up|name is)\b")
+
+# Substring vocabularies: one compiled alternation each, a single scan instead of one `in` per keyword
+_META_INTENT_RE = _substring_re(["learn", "skill", "profile", "lesson", "playbook", "record", "save"])
+_SUMMARY_TRIGGER_RE = _substring_re(["summarize", "summary", "recall", "tell me about", "what is", "recap", "forget", "list documents"])
+_PERSONAL_FACT_RE = _substring_re(["user", "me", "my ", " i ", "identity", "preference", "like"])
+_TECHNICAL_FACT_RE = _substring_re(["file", "path", "code", "error", "script", "project", "repo", "build", "library", "version"])
+
+# Critic revisions: fenced block (possibly after filler text), unclosed fence, or inline backticks
+_MD_STRIP = re.compile(
+    r"```[ \t]*[a-zA-Z]*(?:[ \t]*\n|[ \t]+)(?P<block>.*?)```"
+    r"|^```[^\n]*\n(?P<open>.*)$"
+    r"|^`+(?P<inline>[^`]*)`+$",
+    re.DOTALL,
+)
+
+# Tool dispatch tables
+_TOOL_LIMITS = {"execute": 20}
+_DEFAULT_TOOL_LIMIT = 10
+_SEEN_TOOLS_MAX = 512
+_RECENT_TURNS = 5  # newest turns the rolling window never degrades
+_SANDBOX_MUTATING_TOOLS = frozenset({"write_file", "delete_file", "download_file", "git_clone", "unzip", "move_file", "copy_file", "execute"})
+_STATE_TOOLS = frozenset({"file_system", "knowledge_base", "web_search", "recall", "list_files", "system_utility", "inspect_file", "manage_tasks"})
+_META_TOOLS = frozenset({"manage_tasks", "learn_skill", "update_profile"})
+_LEARNING_TOOLS = frozenset({"learn_skill", "update_profile"})
+_HEAVY_TOOLS = frozenset({"execute", "deep_research"})
+
+# Carriage returns and NULs are dropped from everything that reaches the context window
+_STRIP = str.maketrans("", "", "\r\x00")
+
+def _scrub(text: str) -> str:
+    """Applies _STRIP only when needed; the membership tests are memchr scans and most text has neither char."""
+    if "\r" in text or "\x00" in text:
+        return text.translate(_STRIP)
+    return text
+
+_TRUNC_MARKER = "\n...[TRUNCATED]...\n"
+_OFFLOAD_THRESHOLD = 64 * 1024
+
+def _coerce_tool_result(result: Any):
+    """
+    Returns (full text, context-safe text) for a tool result, keeping the head and tail of long outputs.
+    The full text only feeds status checks, so only the kept slices are scrubbed.
+    """
+    text = result if type(result) is str else str(result)
+    if len(text) > 4000:
+        return text, _scrub("".join((text[:2000], _TRUNC_MARKER, text[-2000:])))
+    return text, _scrub(text)
+
+def _content_str(msg: Dict[str, Any]) -> str:
+    """Message content as text; skips the str() call for the common already-a-string case."""
+    content = msg.get("content")
+    if type(content) is str:
+        return content
+    return "" if content is None else str(content)
+
+def _load_malloc_trim():
+    """Resolves glibc's malloc_trim once; None where it doesn't exist (macOS, musl)."""
+    if platform.system() != "Linux":
+        return None
+    try:
+        return ctypes.CDLL("libc.so.6").malloc_trim
+    except Exception:
+        return None
+
+_MALLOC_TRIM = _load_malloc_trim()
+# Requests between automatic gc + malloc_trim passes (0 disables them)
+_MEMORY_TRIM_INTERVAL = int(os.environ.get("GHOST_MEMORY_TRIM_INTERVAL", "64"))
+
+def _tool_fingerprint(msg: Dict[str, Any], content: str) -> bytes:
+    """Fixed-width dedup key for a tool output: tool name plus the head of its content."""
+    return hashlib.blake2b(f"{msg.get('name', 'unknown')}:{content[:256]}".encode(), digest_size=8).digest()
+
+def _group_turns(history: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    """Splits history into turns: each non-tool message opens one, tool results join the call before them."""
+    groups: List[List[Dict[str, Any]]] = []
+    for msg in history:
+        if msg.get("role") == "tool" and groups:
+            groups[-1].append(msg)
+        else:
+            groups.append([msg])
+    return groups
+
+def _degraded_turns(group: List[Dict[str, Any]]):
+    """Yields a turn as-is, then with bulky tool output compressed to head+tail, then truncated to its head."""
+    yield group
+    for limit, shrink in (
+        (5000, lambda c: c[:2000] + "\n... [OLD DATA COMPRESSED] ...\n" + c[-2000:]),
+        (500, lambda c: c[:500] + "\n... [OLD DATA TRUNCATED] ..."),
+    ):
+        yield [
+            {**m, "content": shrink(c)} if m.get("role") == "tool" and len(c := _content_str(m)) > limit else m
+            for m in group
+        ]
+
+def _loads_lenient(raw: str) -> Any:
+    """orjson fast path; stdlib json (strict=False) only when orjson rejects the payload."""
+    try:
+        return orjson.loads(raw)
+    except orjson.JSONDecodeError:
+        return json.loads(raw, strict=False)
+
 def extract_json_from_text(text: str) -> dict:
     """Safely extracts JSON from LLM outputs, ignoring conversational filler and markdown blocks."""
-    import re, json
     try:
-        match = re.search(r'```(?:json)?\s*(\{.*?\})\s*```', text, re.DOTALL | re.IGNORECASE)
-        if match: return json.loads(match.group(1))
+        # json_object mode usually returns a bare object; skip the fence regex when it parses as-is
+        stripped = text.strip()
+        if stripped[:1] == "{" and stripped[-1:] == "}":
+            try: return _loads_lenient(stripped)
+            except Exception: pass
+        match = _JSON_BLOCK_RE.search(text)
+        if match: return _loads_lenient(match.group(1))
         start = text.find('{')
         end = text.rfind('}')
-        if start != -1 and end != -1: return json.loads(text[start:end+1])
-        return json.loads(text)
+        if start != -1 and end != -1: return _loads_lenient(text[start:end+1])
+        return _loads_lenient(text)
     except Exception:
         return {}
 
@@ -50,7 +181,7 @@ class GhostContext:
         self.sandbox_manager = None
         self.scheduler = None
         self.last_activity_time = datetime.datetime.now()
-        self.cached_sandbox_state = None
+        self.cached_sandbox_state = None  # (sandbox mtime_ns, listing)
 
 class GhostAgent:
     def __init__(self, context: GhostContext):
@@ -58,27 +189,59 @@ class GhostAgent:
         self.available_tools = get_available_tools(context)
         self.agent_semaphore = asyncio.Semaphore(1)
         self.memory_semaphore = asyncio.Semaphore(1)
+        self.llm_cache = LLMCache()
+        self.tool_cache = ToolResultCache()
+        self.request_count = 0
 
-    def release_unused_ram(self):
+    def release_unused_ram(self, full: bool = False):
         try:
-            gc.collect()
-            if platform.system() == "Linux":
-                try:
-                    libc = ctypes.CDLL("libc.so.6")
-                    libc.malloc_trim(0)
+            # Per-request garbage is young; walking gen 2 rarely frees anything between requests
+            gc.collect() if full else gc.collect(1)
+            if _MALLOC_TRIM is not None:
+                try: _MALLOC_TRIM(0)
                 except: pass
         except: pass
 
+    async def _cached_chat_completion(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """chat_completion with a response cache for deterministic (temperature 0) side calls."""
+        key = self.llm_cache.make_key(payload)
+        if key:
+            cached = self.llm_cache.get(key)
+            if cached is not None:
+                pretty_log("LLM Cache", f"Hit: {self.llm_cache.stats()}", icon=Icons.MEM_MATCH)
+                return cached
+        data = await self.context.llm_client.chat_completion(payload)
+        if key: self.llm_cache.set(key, data)
+        return data
+
     def clear_session(self):
         if hasattr(self.context, 'scratchpad') and self.context.scratchpad:
             self.context.scratchpad.clear()
-        self.release_unused_ram()
+        self.release_unused_ram(full=True)
         return True
 
+    async def _get_sandbox_state(self) -> str:
+        """
+        Shallow sandbox listing, reused while the sandbox directory's mtime is unchanged.
+        Entries are only added, removed or renamed through the directory, so its mtime is a
+        sufficient freshness key for a top-level listing.
+        """
+        from ..tools.file_system import tool_list_files
+        try:
+            stamp = os.stat(self.context.sandbox_dir).st_mtime_ns
+        except (OSError, TypeError):
+            stamp = None
+        cached = self.context.cached_sandbox_state
+        if stamp is not None and isinstance(cached, tuple) and cached[0] == stamp:
+            return cached[1]
+        sandbox_state = await tool_list_files(self.context.sandbox_dir, self.context.memory_system)
+        self.context.cached_sandbox_state = (stamp, sandbox_state)
+        return sandbox_state
+
     def _prepare_planning_context(self, tools_run_this_turn: List[Dict[str, Any]]) -> str:
         last_tool_output = tools_run_this_turn[-1]["content"] if tools_run_this_turn else "None (Start of Task)"
         if len(last_tool_output) > 5000:
-            last_tool_output = last_tool_output[:2500] + "\n...[TRUNCATED]...\n" + last_tool_output[-2500:]
+            last_tool_output = last_tool_output[:2500] + _TRUNC_MARKER + last_tool_output[-2500:]
         return last_tool_output
 
     def _get_recent_transcript(self, messages: List[Dict[str, Any]]) -> str:
@@ -94,19 +257,42 @@ class GhostAgent:
 
     def process_rolling_window(self, messages: List[Dict[str, Any]], max_tokens: int) -> List[Dict[str, Any]]:
         if not messages: return []
-        system_msgs = [m for m in messages if m.get("role") == "system"]
-        raw_history = [m for m in messages if m.get("role") != "system"]
-        
-        clean_history = []
+        system_msgs, raw_history = [], []
+        for m in messages:
+            (system_msgs if m.get("role") == "system" else raw_history).append(m)
+        system_tokens = sum(estimate_tokens_cached(_content_str(m)) for m in system_msgs)
+
+        # Fast path: nothing to dedupe or drop and everything fits the budget
+        size, fingerprints, needs_rewrite = 0, set(), False
+        for msg in raw_history:
+            role, content = msg.get("role"), _content_str(msg)
+            if role == "tool":
+                fingerprint = _tool_fingerprint(msg, content)
+                if fingerprint in fingerprints:
+                    needs_rewrite = True; break
+                fingerprints.add(fingerprint)
+            elif role == "assistant" and len(content) < 100:
+                lower_content = content.lower()
+                if "memory updated" in lower_content or "memory stored" in lower_content:
+                    needs_rewrite = True; break
+            # UTF-8 bytes are a hard ceiling on byte-level BPE tokens (CJK or dense code can run 1-2 chars/token)
+            size += len(content) if content.isascii() else len(content.encode("utf-8"))
+        if not needs_rewrite:
+            # Fits even at one token per byte: no tokenizer pass needed
+            if size + system_tokens <= max_tokens:
+                return system_msgs + raw_history
+            if sum(estimate_tokens_cached(_content_str(m)) for m in raw_history) + system_tokens <= max_tokens:
+                return system_msgs + raw_history
+
+        # Newest-to-oldest: keep the newest copy of each tool output and drop memory chatter
+        history = []
         seen_tool_outputs = set()
-        
         for msg in reversed(raw_history):
             role = msg.get("role")
-            content = str(msg.get("content", ""))
+            content = _content_str(msg)
             
             if role == "tool":
-                tool_name = msg.get('name', 'unknown')
-                fingerprint = f"{tool_name}:{content[:100]}"
+                fingerprint = _tool_fingerprint(msg, content)
                 if fingerprint in seen_tool_outputs:
                     continue
                 seen_tool_outputs.add(fingerprint)
@@ -115,36 +301,44 @@ class GhostAgent:
                 lower_content = content.lower()
                 if ("memory updated" in lower_content or "memory stored" in lower_content) and len(content) < 100:
                     continue
-                    
-            clean_history.append(msg)
-            
-        clean_history.reverse()
-        compressed_history = []
-        msg_count = len(clean_history)
-        
-        for i, msg in enumerate(clean_history):
-            role, content = msg.get("role"), str(msg.get("content", ""))
-            if role == "tool" and (msg_count - i) > 5 and len(content) > 5000:
-                msg["content"] = content[:2000] + "\n... [OLD DATA COMPRESSED] ...\n" + content[-2000:]
-            compressed_history.append(msg)
-
-        current_tokens = sum(estimate_tokens(str(m.get("content", ""))) for m in system_msgs)
-        final_history = []
-        for msg in reversed(compressed_history):
-            msg_tokens = estimate_tokens(str(msg.get("content", "")))
-            if current_tokens + msg_tokens > max_tokens: break
-            final_history.append(msg)
-            current_tokens += msg_tokens
+            history.append(msg)
+        history.reverse()
+
+        # Budget whole turns so a tool result is never kept without the call that produced it:
+        # the newest turns verbatim, then the opening turn, then older turns newest-first, each
+        # tried as-is, with bulky tool output compressed, then truncated, before it is dropped.
+        groups = _group_turns(history)
+        picked: List[Optional[List[Dict[str, Any]]]] = [None] * len(groups)
+        budget = max_tokens - system_tokens
+
+        def take(i: int, variants) -> bool:
+            nonlocal budget
+            for variant in variants:
+                cost = sum(estimate_tokens_cached(_content_str(m)) for m in variant)
+                if cost <= budget:
+                    picked[i] = variant
+                    budget -= cost
+                    return True
+            return False
+
+        recent_start = max(len(groups) - _RECENT_TURNS, 0)
+        filled_to = len(groups)
+        for i in range(len(groups) - 1, recent_start - 1, -1):
+            if not take(i, [groups[i]]): break
+            filled_to = i
+        if filled_to == recent_start and recent_start > 0:
+            take(0, _degraded_turns(groups[0]))
+            for i in range(recent_start - 1, 0, -1):
+                if not take(i, _degraded_turns(groups[i])): break
             
-        final_history.reverse()
-        return system_msgs + final_history
+        return system_msgs + [m for group in picked if group for m in group]
 
     def _prune_context(self, messages: List[Dict[str, Any]], max_tokens: int = 8000) -> List[Dict[str, Any]]:
         """
         Proactively prunes messages to fit within context limits during the reasoning loop.
         Prioritizes: System Prompt > Last User Message > Recent History
         """
-        current_tokens = sum(estimate_tokens(str(m.get("content", ""))) for m in messages)
+        current_tokens = sum(estimate_tokens_cached(_content_str(m)) for m in messages)
         if current_tokens < max_tokens:
             return messages
             
@@ -155,9 +349,9 @@ class GhostAgent:
         last_user = next((m for m in reversed(messages) if m.get("role") == "user"), None)
         
         # Calculate base tokens (System + Last User)
-        base_tokens = sum(estimate_tokens(str(m.get("content", ""))) for m in system_msgs)
+        base_tokens = sum(estimate_tokens_cached(_content_str(m)) for m in system_msgs)
         if last_user:
-            base_tokens += estimate_tokens(str(last_user.get("content", "")))
+            base_tokens += estimate_tokens_cached(_content_str(last_user))
             
         remaining_budget = max_tokens - base_tokens - 500 # 500 buffer
         if remaining_budget < 0:
@@ -172,7 +366,7 @@ class GhostAgent:
             if m.get("role") == "system" or m == last_user:
                 continue
                 
-            msg_tokens = estimate_tokens(str(m.get("content", "")))
+            msg_tokens = estimate_tokens_cached(_content_str(m))
             if remaining_budget - msg_tokens >= 0:
                 pruned_history.append(m)
                 remaining_budget -= msg_tokens
@@ -186,32 +380,40 @@ class GhostAgent:
             
         return final_msgs
 
+    async def _run_in_request(self, request_id: str, job, *args):
+        """Runs a background job under the request id captured at scheduling time, so its logs stay attributed."""
+        token = request_id_context.set(request_id)
+        try:
+            await job(*args)
+        finally:
+            request_id_context.reset(token)
+
     async def run_smart_memory_task(self, interaction_context: str, model_name: str, selectivity: float):
         if not self.context.memory_system: return
         async with self.memory_semaphore:
-            interaction_context = interaction_context.replace("\r", "")
+            interaction_context = _scrub(interaction_context)
             ic_lower = interaction_context.lower()
             ic_parts = ic_lower.split("ai:")
             user_msg = ic_parts[0] if len(ic_parts) > 0 else ""
             ai_msg = ic_parts[1] if len(ic_parts) > 1 else ""
             
-            summary_triggers = ["summarize", "summary", "recall", "tell me about", "what is", "recap", "forget", "list documents"]
-            is_requesting_summary = any(w in user_msg for w in summary_triggers)
+            is_requesting_summary = bool(_SUMMARY_TRIGGER_RE.search(user_msg))
             
             if is_requesting_summary and len(ai_msg) > 500:
                 return
                 
+            from .prompts import SMART_MEMORY_PROMPT
             final_prompt = SMART_MEMORY_PROMPT + f"\n{interaction_context}"
             try:
-                payload = {"model": model_name, "messages": [{"role": "user", "content": final_prompt}], "stream": False, "temperature": 0.1, "response_format": {"type": "json_object"}}
+                payload = {"model": model_name, "messages": [{"role": "user", "content": final_prompt}], "stream": False, "temperature": 0.1, "response_format": MEMORY_SCORE_FORMAT}
                 data = await self.context.llm_client.chat_completion(payload)
                 content = data["choices"][0]["message"]["content"]
                 result_json = extract_json_from_text(content)
                 score, fact, profile_up = float(result_json.get("score", 0.0)), result_json.get("fact", ""), result_json.get("profile_update", None)
                 
                 fact_lc = fact.lower()
-                is_personal = any(w in fact_lc for w in ["user", "me", "my ", " i ", "identity", "preference", "like"])
-                is_technical = any(w in fact_lc for w in ["file", "path", "code", "error", "script", "project", "repo", "build", "library", "version"])
+                is_personal = bool(_PERSONAL_FACT_RE.search(fact_lc))
+                is_technical = bool(_TECHNICAL_FACT_RE.search(fact_lc))
                 
                 if score >= selectivity and fact and len(fact) <= 200 and len(fact) >= 5 and "none" not in fact_lc:
                     if score >= 0.9 and not (is_personal or is_technical):
@@ -227,7 +429,8 @@ class GhostAgent:
     async def handle_chat(self, body: Dict[str, Any], background_tasks, request_id: Optional[str] = None):
         req_id = request_id or str(uuid.uuid4())[:8]
         token = request_id_context.set(req_id)
-        self.context.last_activity_time = datetime.datetime.now()
+        now = datetime.datetime.now()  # one clock read serves activity tracking, the prompt clock and `created`
+        self.context.last_activity_time = now
         
         try:
             async with self.agent_semaphore:
@@ -237,63 +440,51 @@ class GhostAgent:
                 if len(messages) > 500:
                     messages = [m for m in messages if m.get("role") == "system"] + messages[-500:]
                 for m in messages:
-                    if isinstance(m.get("content"), str): m["content"] = m["content"].replace("\r", "")
+                    c = m.get("content")
+                    if type(c) is str: m["content"] = _scrub(c)
                 
-                last_user_content = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+                last_user_content = next((_content_str(m) for m in reversed(messages) if m.get("role") == "user"), "")
                 lc = last_user_content.lower()
                 
-                coding_keywords = [r"\bpython\b", r"\bbash\b", r"\bsh\b", r"\bscript\b", r"\bcode\b", r"\bdef\b", r"\bimport\b"]
-                coding_actions = [r"\bwrite\b", r"\brun\b", r"\bexecute\b", r"\bdebug\b", r"\bfix\b", r"\bcreate\b", r"\bgenerate\b", r"\bcount\b", r"\bcalculate\b", r"\banalyze\b", r"\bscrape\b", r"\bplot\b", r"\bgraph\b"]
-                has_coding_intent = False
-                
-                if any(re.search(k, lc) for k in coding_keywords):
-                    if any(re.search(a, lc) for a in coding_actions): 
-                        has_coding_intent = True
-                if any(x in lc for x in ["execute", ".py"]) or re.search(r'\bscript\b', lc): 
+                # One tokenisation pass; \b-bounded keywords become set lookups over the word set
+                words = set(_WORD_RE.findall(lc))
+                has_coding_intent = not words.isdisjoint(_CODING_KEYWORDS) and not words.isdisjoint(_CODING_ACTIONS)
+                if "script" in words or "execute" in lc or ".py" in lc:
                     has_coding_intent = True
                 
-                dba_keywords = [r"\bsql\b", r"\bpostgres\b", r"\bpostgresql\b", r"\bpsql\b", r"\bdatabase\b", r"\bpg_stat\b", r"\bexplain analyze\b", r"\bquery\b", r"\bcte\b", r"\brdbms\b", r"\bdba\b", r"\bschema\b", r"\bvacuum\b", r"\bmvcc\b"]
-                has_dba_intent = any(re.search(k, lc) for k in dba_keywords)
-                
-                meta_keywords = [r"\btitle\b", r"\bname this\b", r"\brename\b", r"\bsummary\b", r"\bsummarize\b", r"\bcaption\b", r"\bdescribe\b"]
-                is_meta_task = any(re.search(k, lc) for k in meta_keywords)
-                if re.match(r'^[\d\s\+\-\*\/\(\)\=\?]+$', lc):
+                has_dba_intent = not words.isdisjoint(_DBA_KEYWORDS) or bool(_DBA_PHRASE_RE.search(lc))
+                is_meta_task = not words.isdisjoint(_META_KEYWORDS) or bool(_META_PHRASE_RE.search(lc))
+                if _ARITH_RE.match(lc):
                     has_coding_intent = False
+                user_has_meta_intent = bool(_META_INTENT_RE.search(lc))  # re-used by the tool loop's completion checks
                     
                 profile_context = self.context.profile_memory.get_context_string() if self.context.profile_memory else ""
-                profile_context = profile_context.replace("\r", "")
-                
-                scratch_data = self.context.scratchpad.list_all() if hasattr(self.context, 'scratchpad') else "None."
-                working_memory_context = f"\n\n### SCRAPBOOK (Persistent Data):\n{scratch_data}\n\n"
-                
-
+                profile_context = _scrub(profile_context)
 
                 if has_dba_intent and not is_meta_task:
+                    from .prompts import DBA_SYSTEM_PROMPT
                     base_prompt, current_temp = DBA_SYSTEM_PROMPT, 0.15
                     pretty_log("Mode Switch", "Ghost PostgreSQL DBA Activated", icon=Icons.MODE_GHOST)
-                    if profile_context: base_prompt = base_prompt.replace("{{PROFILE}}", profile_context)
                 elif has_coding_intent:
                     base_prompt, current_temp = CODE_SYSTEM_PROMPT, 0.2
                     pretty_log("Mode Switch", "Ghost Python Specialist Activated", icon=Icons.MODE_GHOST)
-                    if profile_context: base_prompt = base_prompt.replace("{{PROFILE}}", profile_context)
                 else:
-                    base_prompt, current_temp = SYSTEM_PROMPT.replace("{{PROFILE}}", profile_context), self.context.args.temperature
-                    
-                base_prompt += working_memory_context
-                base_prompt = base_prompt.replace("{{CURRENT_TIME}}", datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')).replace("\r", "")
+                    base_prompt, current_temp = SYSTEM_PROMPT, self.context.args.temperature
                 
-                found_system = False
-                for m in messages:
-                    if m.get("role") == "system": m["content"] = base_prompt; found_system = True; break
-                if not found_system: messages.insert(0, {"role": "system", "content": base_prompt})
+                # Looked up once; every later system-prompt edit goes through this reference
+                system_msg = next((m for m in messages if m.get("role") == "system"), None)
+                if system_msg is not None:
+                    system_msg["content"] = base_prompt
+                else:
+                    system_msg = {"role": "system", "content": base_prompt}
+                    messages.insert(0, system_msg)
                 
                 if "task" in lc and ("list" in lc or "show" in lc or "what" in lc or "status" in lc):
                      current_tasks = await tool_list_tasks(self.context.scheduler)
-                     messages.append({"role": "system", "content": f"SYSTEM DATA DUMP:\n{current_tasks}\n\nINSTRUCTION: The user cannot see the data above. You MUST copy the task list into your **FINAL ANSWER** now."})
+                     messages.append({"role": "system", "content": f"SYSTEM DATA DUMP:\n{current_tasks}\n\nINSTRUCTION: The user cannot see the data above. You MUST copy the task list into your final answer now."})
                 
                 is_fact_check = "fact-check" in lc or "verify" in lc
-                trivial_triggers = ["who are you", "hello", " hi ", "hey there", "how are you", "what's up", "name is"]
-                is_trivial = any(t in last_user_content.lower() for t in trivial_triggers)
+                is_trivial = bool(_TRIVIAL_RE.search(lc))
                 
                 should_fetch_memory = (
                     not is_fact_check and 
@@ -304,35 +495,60 @@ class GhostAgent:
                 if self.context.memory_system and last_user_content and should_fetch_memory:
                     mem_context = self.context.memory_system.search(last_user_content)
                     if mem_context:
-                        mem_context = mem_context.replace("\r", "")
+                        mem_context = _scrub(mem_context)
                         pretty_log("Memory Context", f"Retrieved for: {last_user_content}", icon=Icons.BRAIN_CTX)
                         messages.insert(1, {"role": "system", "content": f"[MEMORY CONTEXT]:\n{mem_context}"})
                         
                 if self.context.skill_memory:
                     playbook = self.context.skill_memory.get_playbook_context(query=last_user_content, memory_system=self.context.memory_system)
-                    for m in messages:
-                        if m.get("role") == "system":
-                            m["content"] += f"\n\n{playbook}"
-                            break
+                    system_msg["content"] += f"\n\n{playbook}"
                             
-                messages = self.process_rolling_window(messages, self.context.args.max_context)
+                # Time and profile change between requests, so they ride next to the newest user turn instead of
+                # the system prompt: the persona prompt and every earlier turn stay a stable, cacheable prefix
+                request_context = render_prompt(REQUEST_CONTEXT_PROMPT, CURRENT_TIME=now.strftime('%Y-%m-%d %H:%M:%S'), PROFILE=profile_context)
+                messages = self.process_rolling_window(messages, self.context.args.max_context - estimate_tokens_cached(request_context))
+                context_at = next((i for i in range(len(messages) - 1, -1, -1) if messages[i].get("role") == "user"), len(messages))
+                messages.insert(context_at, {"role": "system", "content": request_context})
+                
+                # The live sandbox/scrapbook sections sit in fixed slots after the static system prompt
+                system_base = system_msg["content"]
+                sandbox_section, dynamic_sections = "", None
+                strategy_msg = None  # the planner's system message, once created
                 
-                final_ai_content, created_time = "", int(datetime.datetime.now().timestamp())
-                force_stop, seen_tools, tool_usage, last_was_failure = False, set(), {}, False
+                content_parts: List[str] = []  # assistant text, joined once after the loop
+                created_time = int(now.timestamp())
+                force_stop, tool_usage, last_was_failure = False, {}, False
+                seen_tools: "OrderedDict[int, None]" = OrderedDict()  # LRU of call hashes, capped at _SEEN_TOOLS_MAX
                 raw_tools_called = set()
                 execution_failure_count = 0
                 tools_run_this_turn = []
                 forget_was_called = False
                 thought_content = ""
+                has_meta_intent = user_has_meta_intent  # widened by each new planner thought
                 was_complex_task = False
                 
                 task_tree = TaskTree()
                 current_plan_json = {}
+
+                # One request dict for the whole loop; only messages and temperature change per turn
+                payload = {
+                    "model": model, 
+                    "messages": messages, 
+                    "stream": False, 
+                    "tools": TOOL_DEFINITIONS, 
+                    "tool_choice": "auto", 
+                    "temperature": current_temp, 
+                    "frequency_penalty": 0.5,
+                    "max_tokens": 4096
+                }
                 
                 for turn in range(20):
                     if turn > 2: was_complex_task = True
                     if force_stop: break
                     
+                    # Refresh the sandbox listing while the planner request is in flight
+                    sandbox_task = asyncio.create_task(self._get_sandbox_state()) if has_coding_intent else None
+                    
                     use_plan = getattr(self.context.args, 'use_planning', True)
                     if use_plan and not is_trivial:
                         pretty_log("Reasoning Loop", f"Turn {turn+1} Strategic Analysis...", icon=Icons.BRAIN_PLAN)
@@ -346,14 +562,15 @@ class GhostAgent:
 User Request: {last_user_content}
 Last Tool Output: {last_tool_output}
 ### CURRENT PLAN (JSON)
-{json.dumps(current_plan_json, indent=2) if current_plan_json else "No plan yet."}
+{orjson.dumps(current_plan_json, option=orjson.OPT_INDENT_2).decode() if current_plan_json else "No plan yet."}
 """
+                        from .prompts import PLANNING_SYSTEM_PROMPT
                         planning_payload = {
                             "model": model,
                             "messages": [{"role": "system", "content": PLANNING_SYSTEM_PROMPT}, {"role": "user", "content": planning_prompt}],
                             "temperature": 0.1,
                             "max_tokens": 1024,
-                            "response_format": {"type": "json_object"}
+                            "response_format": PLAN_UPDATE_FORMAT
                         }
                         
                         try:
@@ -362,6 +579,7 @@ Last Tool Output: {last_tool_output}
                             plan_json = extract_json_from_text(plan_content)
                             
                             thought_content = plan_json.get("thought", "No thought provided.")
+                            has_meta_intent = user_has_meta_intent or bool(_META_INTENT_RE.search(thought_content.lower()))
                             tree_update = plan_json.get("tree_update", {})
                             next_action_id = plan_json.get("next_action_id", "")
                             
@@ -371,14 +589,12 @@ Last Tool Output: {last_tool_output}
                                 
                             tree_render = task_tree.render()
                             
-                            found_checklist = False
-                            for m in messages:
-                                if m.get("role") == "system" and "### ACTIVE STRATEGY" in m.get("content", ""):
-                                    m["content"] = f"### ACTIVE STRATEGY & PLAN (DO NOT SKIP ANY STEP):\nTHOUGHT: {thought_content}\n\nPLAN:\n{tree_render}\n\nFOCUS TASK: {next_action_id}"
-                                    found_checklist = True
-                                    break
-                            if not found_checklist:
-                                messages.append({"role": "system", "content": f"### ACTIVE STRATEGY & PLAN (DO NOT SKIP ANY STEP):\nTHOUGHT: {thought_content}\n\nPLAN:\n{tree_render}\n\nFOCUS TASK: {next_action_id}"})
+                            plan_text = f"### ACTIVE STRATEGY & PLAN (DO NOT SKIP ANY STEP):\nTHOUGHT: {thought_content}\n\nPLAN:\n{tree_render}\n\nFOCUS TASK: {next_action_id}"
+                            if strategy_msg is None:
+                                strategy_msg = {"role": "system", "content": plan_text}
+                                messages.append(strategy_msg)
+                            else:
+                                strategy_msg["content"] = plan_text
                             
                             pretty_log("INTERNAL MONOLOGUE", icon=Icons.BRAIN_THINK, special_marker="SECTION_START")
                             pretty_log("Planner Monologue", thought_content, icon=Icons.BRAIN_THINK)
@@ -389,37 +605,20 @@ Last Tool Output: {last_tool_output}
                                 pretty_log("Finalizing", "Agent signaled completion", icon=Icons.OK)
                         except Exception as e:
                             logger.error(f"Planning step failed: {e}")
-                            if not any("### ACTIVE STRATEGY" in m.get("content", "") for m in messages):
-                                messages.append({"role": "system", "content": "### ACTIVE STRATEGY: Proceed with the next logical step to fulfill the user request."})
+                            if strategy_msg is None:
+                                strategy_msg = {"role": "system", "content": "### ACTIVE STRATEGY: Proceed with the next logical step to fulfill the user request."}
+                                messages.append(strategy_msg)
 
                     scratch_data = self.context.scratchpad.list_all() if hasattr(self.context, 'scratchpad') else "None."
                     
-                    if has_coding_intent:
-                        if self.context.cached_sandbox_state is None:
-                            from ..tools.file_system import tool_list_files
-                            params = {
-                                "sandbox_dir": self.context.sandbox_dir, 
-                                "memory_system": self.context.memory_system
-                            }
-                            sandbox_state = await asyncio.to_thread(lambda: asyncio.run(tool_list_files(**params)) if asyncio.iscoroutinefunction(tool_list_files) else tool_list_files(**params))
-                            self.context.cached_sandbox_state = sandbox_state
-                        else:
-                            sandbox_state = self.context.cached_sandbox_state
-                            
-                        for m in messages:
-                            if m.get("role") == "system":
-                                content = re.sub(r'\n### CURRENT SANDBOX STATE \(Eyes-On\):.*?\n\n', '\n', m["content"], flags=re.DOTALL)
-                                content += f"\n### CURRENT SANDBOX STATE (Eyes-On):\n{sandbox_state}\n\n"
-                                content = re.sub(r'\n### SCRAPBOOK \(Persistent Data\):.*?\n\n', '\n', content, flags=re.DOTALL)
-                                content += f"\n### SCRAPBOOK (Persistent Data):\n{scratch_data}\n\n"
-                                m["content"] = content
-                                break
-                    else:
-                        for m in messages:
-                            if m.get("role") == "system":
-                                m["content"] = re.sub(r'\n### SCRAPBOOK \(Persistent Data\):.*?\n\n', '\n', m["content"], flags=re.DOTALL)
-                                m["content"] += f"\n### SCRAPBOOK (Persistent Data):\n{scratch_data}\n\n"
-                                break
+                    if sandbox_task is not None:
+                        sandbox_state = await sandbox_task
+                        sandbox_section = f"\n### CURRENT SANDBOX STATE (Eyes-On):\n{sandbox_state}\n\n"
+                        
+                    sections = f"{sandbox_section}\n### SCRAPBOOK (Persistent Data):\n{scratch_data}\n\n"
+                    if sections != dynamic_sections:
+                        system_msg["content"] = system_base + sections
+                        dynamic_sections = sections
 
                     if last_was_failure:
                         if execution_failure_count == 1:
@@ -435,27 +634,19 @@ Last Tool Output: {last_tool_output}
                     # Proactive Context Pruning before request
                     messages = self._prune_context(messages, max_tokens=self.context.args.max_context)
 
-                    payload = {
-                        "model": model, 
-                        "messages": messages, 
-                        "stream": False, 
-                        "tools": TOOL_DEFINITIONS, 
-                        "tool_choice": "auto", 
-                        "temperature": active_temp, 
-                        "frequency_penalty": 0.5,
-                        "max_tokens": 4096
-                    }
+                    payload["messages"] = messages
+                    payload["temperature"] = active_temp
                     
                     pretty_log("LLM Request", f"Turn {turn+1} | Temp {active_temp:.2f}", icon=Icons.LLM_ASK)
                     
                     # Ensure msg is always defined in this scope
                     msg = {"role": "assistant", "content": "", "tool_calls": []}
                     try:
-                        data = await self.context.llm_client.chat_completion(payload)
+                        data = await self.context.llm_client.chat_completion(payload, tools_blob=TOOL_DEFINITIONS_JSON)
                         if "choices" in data and len(data["choices"]) > 0:
                             msg = data["choices"][0]["message"]
                     except (httpx.ConnectError, httpx.ConnectTimeout):
-                        final_ai_content = "CRITICAL: The upstream LLM server is unreachable. It may have crashed due to memory pressure or is currently restarting. Please wait a moment and try again."
+                        content_parts = ["CRITICAL: The upstream LLM server is unreachable. It may have crashed due to memory pressure or is currently restarting. Please wait a moment and try again."]
                         pretty_log("System Fault", "Upstream server unreachable", level="ERROR", icon=Icons.FAIL)
                         force_stop = True
                         break
@@ -481,20 +672,20 @@ Last Tool Output: {last_tool_output}
                             # RETRY ONCE with pruned context
                             try:
                                 payload["messages"] = messages
-                                data = await self.context.llm_client.chat_completion(payload)
+                                data = await self.context.llm_client.chat_completion(payload, tools_blob=TOOL_DEFINITIONS_JSON)
                                 if "choices" in data and len(data["choices"]) > 0:
                                     msg = data["choices"][0]["message"]
                             except Exception as retry_e:
-                                final_ai_content = f"CRITICAL: Context overflow recovery failed: {str(retry_e)}"
+                                content_parts = [f"CRITICAL: Context overflow recovery failed: {str(retry_e)}"]
                                 force_stop = True
                                 break
                         else:
-                            final_ai_content = f"CRITICAL: Upstream error {e.response.status_code}: {e.response.text}"
+                            content_parts = [f"CRITICAL: Upstream error {e.response.status_code}: {e.response.text}"]
                             pretty_log("System Fault", f"HTTP {e.response.status_code}", level="ERROR", icon=Icons.FAIL)
                             force_stop = True
                             break
                     except Exception as e:
-                        final_ai_content = f"CRITICAL: An unexpected error occurred while communicating with the LLM: {str(e)}"
+                        content_parts = [f"CRITICAL: An unexpected error occurred while communicating with the LLM: {str(e)}"]
                         pretty_log("System Fault", str(e), level="ERROR", icon=Icons.FAIL)
                         force_stop = True
                         break
@@ -510,7 +701,7 @@ Last Tool Output: {last_tool_output}
                         
                         # Only try to manually parse if the backend completely missed it
                         if not tool_calls:
-                            matches = re.findall(r'<tool_call>\s*(\{.*?\})\s*</tool_call>', content, re.DOTALL | re.IGNORECASE)
+                            matches = _TOOL_CALL_JSON_RE.findall(content)
                             for match in matches:
                                 try:
                                     t_data = extract_json_from_text(match)
@@ -520,20 +711,20 @@ Last Tool Output: {last_tool_output}
                                             "type": "function",
                                             "function": {
                                                 "name": t_data.get("name"),
-                                                "arguments": json.dumps(t_data.get("arguments", {}))
+                                                "arguments": orjson.dumps(t_data.get("arguments", {})).decode()
                                             }
                                         })
                                 except Exception: pass
                                 
                         # Radically erase the raw syntax so it doesn't pollute the user's chat output
-                        content = re.sub(r'<tool_call>.*?</tool_call>', '', content, flags=re.DOTALL | re.IGNORECASE).strip()
+                        content = _TOOL_CALL_RE.sub('', content).strip()
                     # ---------------------------------------------------------
 
                     if content:
-                        content = content.replace("\r", "")
-                        if final_ai_content and not final_ai_content.endswith("\n\n"):
-                            final_ai_content += "\n\n"
-                        final_ai_content += content
+                        content = _scrub(content)
+                        if content_parts and not content_parts[-1].endswith("\n\n"):
+                            content_parts.append("\n\n")
+                        content_parts.append(content)
                         msg["content"] = content
                     else:
                         msg["content"] = ""
@@ -541,20 +732,19 @@ Last Tool Output: {last_tool_output}
                     msg["tool_calls"] = tool_calls
                     
                     if not tool_calls:
-                        user_request_context = last_user_content.lower()
-                        has_meta_intent = any(kw in user_request_context for kw in ["learn", "skill", "profile", "lesson", "playbook", "record", "save"])
-                        meta_tools_called = any(t in raw_tools_called for t in ["learn_skill", "update_profile"])
+                        meta_tools_called = not _LEARNING_TOOLS.isdisjoint(raw_tools_called)
                         
-                        if has_meta_intent and not meta_tools_called and turn < 4:
+                        if user_has_meta_intent and not meta_tools_called and turn < 4:
                             pretty_log("Checklist Nudge", "Enforcing meta-task compliance", icon=Icons.SHIELD)
                             # Remove the recently added content to prevent duplicating text during the loop
                             if content:
-                                final_ai_content = final_ai_content[:-len(content)].strip()
+                                trimmed = "".join(content_parts)[:-len(content)].strip()
+                                content_parts = [trimmed] if trimmed else []
                             messages.append({"role": "system", "content": "CRITICAL: You have not fulfilled the learning/profile instructions in the user's request. You MUST call 'learn_skill' or 'update_profile' now before finishing."})
                             continue
 
                         if self.context.args.smart_memory > 0.0 and last_user_content and not forget_was_called and not last_was_failure:
-                            background_tasks.add_task(self.run_smart_memory_task, f"User: {last_user_content}\nAI: {final_ai_content}", model, self.context.args.smart_memory)
+                            background_tasks.add_task(self._run_in_request, req_id, self.run_smart_memory_task, f"User: {last_user_content}\nAI: {''.join(content_parts)}", model, self.context.args.smart_memory)
                         break
                         
                     messages.append(msg)
@@ -567,34 +757,31 @@ Last Tool Output: {last_tool_output}
                         raw_tools_called.add(fname)
                         tool_usage[fname] = tool_usage.get(fname, 0) + 1
                         
-                        if fname in ["write_file", "delete_file", "download_file", "git_clone", "unzip", "move_file", "copy_file", "execute"]:
+                        if fname in _SANDBOX_MUTATING_TOOLS:
                             self.context.cached_sandbox_state = None
                             
-                        if fname == "forget":
-                            forget_was_called = True
-                        elif fname == "knowledge_base":
-                            try:
-                                args = json.loads(tool["function"]["arguments"])
-                                if args.get("action") == "forget":
-                                    forget_was_called = True
-                            except: pass
-
-                        if tool_usage[fname] > (20 if fname == "execute" else 10):
+                        if tool_usage[fname] > _TOOL_LIMITS.get(fname, _DEFAULT_TOOL_LIMIT):
                             pretty_log("Loop Breaker", f"Halted overuse: {fname}", icon=Icons.STOP)
                             messages.append({"role": "system", "content": f"SYSTEM: Tool '{fname}' used too many times."})
                             force_stop = True; break
 
                         try:
-                            t_args = json.loads(tool["function"]["arguments"])
-                            a_hash = f"{fname}:{json.dumps(t_args, sort_keys=True)}"
+                            t_args = orjson.loads(tool["function"]["arguments"])
+                            digest = hashlib.blake2b(fname.encode(), digest_size=8)
+                            digest.update(b"\0")
+                            digest.update(orjson.dumps(t_args, option=orjson.OPT_SORT_KEYS))
+                            a_hash = int.from_bytes(digest.digest(), "little")
                         except Exception as e:
                             err_msg = {"role": "tool", "tool_call_id": tool["id"], "name": fname, "content": f"Error: Invalid JSON arguments - {str(e)}"}
                             messages.append(err_msg)
                             tools_run_this_turn.append(err_msg)
                             last_was_failure = True
                             continue
+
+                        if fname == "forget" or (fname == "knowledge_base" and isinstance(t_args, dict) and t_args.get("action") == "forget"):
+                            forget_was_called = True
                         
-                        is_state_tool = fname in ["file_system", "knowledge_base", "web_search", "recall", "list_files", "system_utility", "inspect_file", "manage_tasks"]
+                        is_state_tool = fname in _STATE_TOOLS
                         
                         if a_hash in seen_tools and fname != "execute" and not is_state_tool:
                             redundancy_strikes += 1
@@ -603,42 +790,51 @@ Last Tool Output: {last_tool_output}
                             if redundancy_strikes >= 3: force_stop = True
                             continue
                             
-                        seen_tools.add(a_hash)
+                        seen_tools[a_hash] = None
+                        seen_tools.move_to_end(a_hash)
+                        if len(seen_tools) > _SEEN_TOOLS_MAX:
+                            seen_tools.popitem(last=False)
                         
-                        if fname == "execute":
+                        if fname == "execute" and fname in self.available_tools:
                             code_content = t_args.get("content", "")
                             if len(code_content.splitlines()) > 10:
                                 pretty_log("Red Team Audit", "Reviewing complex code for destructive risk...", icon=Icons.SHIELD)
-                                is_approved, revised_code, critique = await self._run_critic_check(code_content, last_user_content, model)
-                                
-                                if not is_approved and revised_code:
-                                    pretty_log("Red Team Intervention", "Code patched for safety/logic.", icon=Icons.SHIELD)
-                                    t_args["content"] = revised_code
-                                    tool["function"]["arguments"] = json.dumps(t_args)
-                                    messages.append({"role": "system", "content": f"RED TEAM INTERVENTION: Your code was auto-corrected before execution.\nCritique: {critique}\nExecuting patched version."})
-                                elif not is_approved:
-                                    pretty_log("Red Team Block", f"{critique}", icon=Icons.SHIELD)
-                                    messages.append({"role": "tool", "tool_call_id": tool["id"], "name": fname, "content": f"RED TEAM BLOCK: {critique}. Rewrite the code."})
-                                    last_was_failure = True
-                                    continue
+                                # The audit runs inside the gather so it overlaps the other tools of this turn
+                                tool_tasks.append(self._audit_and_execute(tool, t_args, last_user_content, model))
+                                tool_call_metadata.append((fname, tool["id"], a_hash, True))
+                                continue
 
-                        if fname in self.available_tools:
+                        if fname in ToolResultCache.CACHEABLE_TOOLS and fname in self.available_tools:
+                            tool_tasks.append(self._run_cacheable_tool(fname, t_args))
+                            tool_call_metadata.append((fname, tool["id"], a_hash, False))
+                        elif fname in self.available_tools:
                             tool_tasks.append(self.available_tools[fname](**t_args))
-                            tool_call_metadata.append((fname, tool["id"], a_hash))
+                            tool_call_metadata.append((fname, tool["id"], a_hash, False))
                         else: messages.append({"role": "tool", "tool_call_id": tool["id"], "name": fname, "content": "Error: Unknown tool"})
 
                     if tool_tasks:
                         results = await asyncio.gather(*tool_tasks, return_exceptions=True)
                         for i, result in enumerate(results):
-                            fname, tool_id, a_hash = tool_call_metadata[i]
-                            str_res = str(result).replace("\r", "") if not isinstance(result, Exception) else f"Error: {str(result)}"
-                            safe_res = str_res[:2000] + "\n...[TRUNCATED]...\n" + str_res[-2000:] if len(str_res) > 4000 else str_res
+                            fname, tool_id, a_hash, audited = tool_call_metadata[i]
+                            if audited and not isinstance(result, Exception):
+                                red_team_msg, result = result
+                                if red_team_msg: messages.append(red_team_msg)
+                                if result is None:
+                                    last_was_failure = True
+                                    continue
+                            if isinstance(result, Exception):
+                                str_res = safe_res = f"Error: {str(result)}"
+                            elif isinstance(result, bytes) and len(result) > _OFFLOAD_THRESHOLD:
+                                # repr() of MB-sized byte outputs would stall the event loop
+                                str_res, safe_res = await asyncio.to_thread(_coerce_tool_result, result)
+                            else:
+                                str_res, safe_res = _coerce_tool_result(result)
                             tool_msg = {"role": "tool", "tool_call_id": tool_id, "name": fname, "content": safe_res}
                             messages.append(tool_msg)
                             tools_run_this_turn.append(tool_msg)
                             
                             if fname == "execute":
-                                code_match = re.search(r"EXIT CODE:\s*(\d+)", str_res)
+                                code_match = _EXIT_CODE_RE.search(str_res)
                                 if code_match:
                                     exit_code_val = int(code_match.group(1))
                                 else:
@@ -651,24 +847,16 @@ Last Tool Output: {last_tool_output}
                                     execution_failure_count += 1
                                     last_was_failure = True
                                     
-                                    error_preview = "Unknown Error"
-                                    if "STDOUT/STDERR:" in str_res:
-                                        error_preview = str_res.split("STDOUT/STDERR:")[1].strip().replace("\n", " ")
-                                    elif "SYSTEM ERROR:" in str_res:
-                                        error_preview = str_res.split("SYSTEM ERROR:")[1].strip().split("\n")[0]
-                                    else:
-                                        error_preview = str_res[:60].replace("\n", " ")
+                                    preview_match = _PREVIEW_RE.search(str_res)
+                                    error_preview = (preview_match.group(1) if preview_match else str_res[:60]).replace("\n", " ")
                                         
                                     pretty_log("Execution Fail", f"Strike {execution_failure_count}/3 -> {error_preview}", icon=Icons.FAIL)
-                                    from ..tools.file_system import tool_list_files
-                                    sandbox_state = await tool_list_files(self.context.sandbox_dir, self.context.memory_system)
+                                    sandbox_state = await self._get_sandbox_state()
                                     messages.append({"role": "system", "content": f"AUTO-DIAGNOSTIC: The script failed. SANDBOX TREE:\n{sandbox_state}"})
                                     if execution_failure_count >= 3: force_stop = True
                                 else:
                                     execution_failure_count = 0
                                     pretty_log("Execution Ok", "Script completed with exit code 0", icon=Icons.OK)
-                                    request_context = (last_user_content + thought_content).lower()
-                                    has_meta_intent = any(kw in request_context for kw in ["learn", "skill", "profile", "lesson", "playbook", "record", "save"])
                                     if not has_meta_intent:
                                         force_stop = True
                                         
@@ -678,17 +866,29 @@ Last Tool Output: {last_tool_output}
                                     error_preview = str_res.replace("Error:", "").strip()
                                     pretty_log("Tool Warning", f"{fname} -> {error_preview}", icon=Icons.WARN)
                                     
-                            elif fname in ["manage_tasks", "learn_skill", "update_profile"] and "SUCCESS" in str_res.upper():
+                            elif fname in _META_TOOLS and "SUCCESS" in str_res.upper():
                                 # Let the agent naturally answer the user instead of halting abruptly.
                                 pass
 
+                final_ai_content = "".join(content_parts)
+
                 # --- THE "PERFECT IT" PROTOCOL INJECTION ---
                 # Only trigger proactive optimization for heavy engineering/research tasks
-                heavy_tools_used = any(t.get('name') in ['execute', 'deep_research'] for t in tools_run_this_turn)
+                heavy_tools_used = not _HEAVY_TOOLS.isdisjoint(t.get('name') for t in tools_run_this_turn)
+                
+                post_mortem_due = (was_complex_task or execution_failure_count > 0) and (not force_stop or "READY TO FINALIZE" in thought_content.upper())
                 
-                if tools_run_this_turn and heavy_tools_used and (not final_ai_content or len(final_ai_content) < 50):
+                # A short answer that ends like a sentence is complete; only a bare/clipped one gets the extra call
+                answer = final_ai_content.strip()
+                needs_perfect = not answer or (len(answer) < 80 and answer[-1] not in ".!?")
+                
+                if tools_run_this_turn and heavy_tools_used and needs_perfect:
                     pretty_log("Perfect It Protocol", "Generating proactive optimization...", icon=Icons.IDEA)
-                    perfect_it_prompt = f"Task completed successfully. Final tool output:\n\n{tools_run_this_turn[-1]['content']}\n\n<system_directive>First, succinctly present the tool output/result to the user. Then, based on your Perfection Protocol, analyze the result and proactively suggest one concrete way to optimize, scale, secure, or automate this work further. RESPOND IN PLAIN TEXT ONLY. DO NOT USE TOOLS.</system_directive>"
+                    plain_prompt = perfect_it_prompt = f"Task completed successfully. Final tool output:\n\n{tools_run_this_turn[-1]['content']}\n\n<system_directive>First, succinctly present the tool output/result to the user. Then, based on your Perfection Protocol, analyze the result and proactively suggest one concrete way to optimize, scale, secure, or automate this work further. RESPOND IN PLAIN TEXT ONLY. DO NOT USE TOOLS.</system_directive>"
+                    if post_mortem_due:
+                        # Fold the post-mortem into the same request so the shared context is only prefilled once
+                        perfect_it_prompt = f"Task completed successfully. Final tool output:\n\n{tools_run_this_turn[-1]['content']}\n\n<system_directive>1. Write the answer for the user: succinctly present the tool output/result, then, based on your Perfection Protocol, proactively suggest one concrete way to optimize, scale, secure, or automate this work further.\n2. Post-mortem: did you encounter a specific error, hurdle, or mistake in this interaction that required a unique solution? If so, extract it as a lesson.\nDO NOT USE TOOLS. Reply with the plain-text answer as final_answer and the lesson (task, mistake, solution), or null, as lesson.</system_directive>"
+                        payload["response_format"] = FINAL_ANSWER_FORMAT
                     messages.append({"role": "system", "content": perfect_it_prompt})
                     
                     payload["messages"] = messages
@@ -700,11 +900,28 @@ Last Tool Output: {last_tool_output}
                     try:
                         perfection_data = await self.context.llm_client.chat_completion(payload)
                         p_msg = perfection_data["choices"][0]["message"].get("content", "")
-                        p_msg = re.sub(r'<tool_call>.*?</tool_call>', '', p_msg, flags=re.DOTALL | re.IGNORECASE).strip()
-                        if final_ai_content:
-                            final_ai_content += "\n\n" + p_msg
-                        else:
-                            final_ai_content = p_msg
+                        if post_mortem_due:
+                            p_json = extract_json_from_text(p_msg or "")
+                            if isinstance(p_json, dict) and p_json:
+                                # Schema-constrained output is never shown as-is: only its final_answer is user text
+                                post_mortem_due = False
+                                p_msg = str(p_json.get("final_answer") or "")
+                                lesson = p_json.get("lesson")
+                                if isinstance(lesson, dict):
+                                    # Storing a lesson embeds it and writes to Chroma; keep that off the response path
+                                    if background_tasks is not None:
+                                        background_tasks.add_task(self._run_in_request, req_id, self._store_lesson, lesson)
+                                    else:
+                                        await self._store_lesson(lesson)
+                            else:
+                                # Unparseable JSON reply: ask again for the plain answer; the post-mortem stays due
+                                messages[-1] = {"role": "system", "content": plain_prompt}
+                                payload.pop("response_format", None)
+                                perfection_data = await self.context.llm_client.chat_completion(payload)
+                                p_msg = perfection_data["choices"][0]["message"].get("content", "")
+                        p_msg = _TOOL_CALL_RE.sub('', p_msg or "").strip()
+                        if p_msg:
+                            final_ai_content = f"{final_ai_content}\n\n{p_msg}" if final_ai_content else p_msg
                     except Exception:
                         if not final_ai_content:
                             final_ai_content = "Task finished successfully, but optimization generation failed."
@@ -712,30 +929,20 @@ Last Tool Output: {last_tool_output}
                     final_ai_content = "Process finished successfully."
 
                 # --- FINAL OUTPUT SCRUBBER ---
-                final_ai_content = re.sub(r'<tool_call>.*?</tool_call>', '', final_ai_content, flags=re.DOTALL | re.IGNORECASE).strip()
+                final_ai_content = _TOOL_CALL_RE.sub('', final_ai_content).strip()
                 if not final_ai_content:
                     final_ai_content = "Task executed successfully."
 
                 # --- AUTOMATED POST-MORTEM (AUTO-LEARNING) ---
-                if was_complex_task or execution_failure_count > 0:
-                    try:
-                        if not force_stop or "READY TO FINALIZE" in thought_content.upper():
-                            history_summary = f"User: {last_user_content}\n"
-                            for t_msg in tools_run_this_turn[-5:]:
-                                history_summary += f"Tool {t_msg['name']}: {t_msg['content'][:200]}\n"
-                                
-                            learn_prompt = f"### TASK POST-MORTEM\nReview this successful but complex interaction. Did the agent encounter a specific error, hurdle, or mistake that required a unique solution? If so, extract it as a lesson.\n\nHISTORY:\n{history_summary}\n\nFINAL AI: {final_ai_content[:500]}\n\nReturn ONLY a JSON object with 'task', 'mistake', and 'solution'. If no unique lesson is found, return null."
-                            
-                            payload = {"model": model, "messages": [{"role": "system", "content": "You are a Meta-Cognitive Analyst."}, {"role": "user", "content": learn_prompt}], "temperature": 0.1, "response_format": {"type": "json_object"}}
-                            l_data = await self.context.llm_client.chat_completion(payload)
-                            l_content = l_data["choices"][0]["message"].get("content", "")
-                            if l_content and "null" not in l_content.lower():
-                                l_json = extract_json_from_text(l_content)
-                                if all(k in l_json for k in ["task", "mistake", "solution"]):
-                                    self.context.skill_memory.learn_lesson(l_json["task"], l_json["mistake"], l_json["solution"], memory_system=self.context.memory_system)
-                                    pretty_log("Auto-Learning", "New lesson captured automatically", icon=Icons.IDEA)
-                    except Exception as e:
-                        logger.error(f"Auto-learning failed: {e}")
+                if post_mortem_due:
+                    history_summary = f"User: {last_user_content}\n"
+                    for t_msg in tools_run_this_turn[-5:]:
+                        history_summary += f"Tool {t_msg['name']}: {t_msg['content'][:200]}\n"
+                    # The lesson never changes the answer, so don't make the user wait for it
+                    if background_tasks is not None:
+                        background_tasks.add_task(self._run_in_request, req_id, self._run_post_mortem, history_summary, final_ai_content, model)
+                    else:
+                        await self._run_post_mortem(history_summary, final_ai_content, model)
 
                 return final_ai_content, created_time, req_id
                 
@@ -747,6 +954,64 @@ Last Tool Output: {last_tool_output}
             
             pretty_log("Request Finished", special_marker="END")
             request_id_context.reset(token)
+            
+            # Full collection + malloc_trim lock every arena; amortize them over many requests
+            self.request_count += 1
+            if _MEMORY_TRIM_INTERVAL and self.request_count % _MEMORY_TRIM_INTERVAL == 0:
+                self.release_unused_ram()
+
+    async def _run_post_mortem(self, history_summary: str, final_ai_content: str, model: str):
+        try:
+            learn_prompt = f"### TASK POST-MORTEM\nReview this successful but complex interaction. Did the agent encounter a specific error, hurdle, or mistake that required a unique solution? If so, extract it as a lesson.\n\nHISTORY:\n{history_summary}\n\nFINAL AI: {final_ai_content[:500]}\n\nReport it as lesson (task, mistake, solution); if no unique lesson is found, lesson is null."
+            
+            payload = {"model": model, "messages": [{"role": "system", "content": "You are a Meta-Cognitive Analyst."}, {"role": "user", "content": learn_prompt}], "temperature": 0.0, "response_format": LESSON_REPORT_FORMAT}
+            l_data = await self._cached_chat_completion(payload)
+            l_content = l_data["choices"][0]["message"].get("content", "")
+            report = extract_json_from_text(l_content) if l_content else None
+            if isinstance(report, dict):
+                await self._store_lesson(report.get("lesson"))
+        except Exception as e:
+            logger.error(f"Auto-learning failed: {e}")
+
+    async def _run_cacheable_tool(self, fname: str, t_args: Dict[str, Any]):
+        """Runs a read-only research tool, reusing the result of an equivalent recent call."""
+        cached = self.tool_cache.lookup(fname, t_args)
+        if cached is not None:
+            pretty_log("Tool Cache", f"Reusing {fname} result", icon=Icons.MEM_MATCH)
+            return cached
+        result = await self.available_tools[fname](**t_args)
+        if isinstance(result, str) and not result.startswith("Error"):
+            self.tool_cache.store(fname, t_args, result)
+        return result
+
+    async def _store_lesson(self, lesson: Any):
+        """_record_lesson on a worker thread: it runs an embedding encode and a Chroma insert."""
+        await asyncio.to_thread(self._record_lesson, lesson)
+
+    def _record_lesson(self, lesson: Any):
+        """Stores a post-mortem lesson if it carries all three fields."""
+        if not isinstance(lesson, dict) or not self.context.skill_memory:
+            return
+        if all(k in lesson for k in ["task", "mistake", "solution"]):
+            self.context.skill_memory.learn_lesson(lesson["task"], lesson["mistake"], lesson["solution"], memory_system=self.context.memory_system)
+            pretty_log("Auto-Learning", "New lesson captured automatically", icon=Icons.IDEA)
+
+    async def _audit_and_execute(self, tool: Dict[str, Any], t_args: Dict[str, Any], task_context: str, model: str):
+        """
+        Runs the red-team critic on an execute call, then executes the (possibly patched) code.
+        Returns (red_team_msg, result); result is None when the critic blocked execution.
+        """
+        is_approved, revised_code, critique = await self._run_critic_check(t_args.get("content", ""), task_context, model)
+        red_team_msg = None
+        if not is_approved and revised_code:
+            pretty_log("Red Team Intervention", "Code patched for safety/logic.", icon=Icons.SHIELD)
+            t_args["content"] = revised_code
+            tool["function"]["arguments"] = orjson.dumps(t_args).decode()
+            red_team_msg = {"role": "system", "content": f"RED TEAM INTERVENTION: Your code was auto-corrected before execution.\nCritique: {critique}\nExecuting patched version."}
+        elif not is_approved:
+            pretty_log("Red Team Block", f"{critique}", icon=Icons.SHIELD)
+            return {"role": "tool", "tool_call_id": tool["id"], "name": "execute", "content": f"RED TEAM BLOCK: {critique}. Rewrite the code."}, None
+        return red_team_msg, await self.available_tools["execute"](**t_args)
 
     async def _run_critic_check(self, code: str, task_context: str, model: str):
         from .prompts import CRITIC_SYSTEM_PROMPT
@@ -756,9 +1021,9 @@ Last Tool Output: {last_tool_output}
                 "model": model, 
                 "messages": [{"role": "system", "content": CRITIC_SYSTEM_PROMPT}, {"role": "user", "content": prompt}], 
                 "temperature": 0.0,
-                "response_format": {"type": "json_object"}
+                "response_format": CRITIC_VERDICT_FORMAT
             }
-            data = await self.context.llm_client.chat_completion(payload)
+            data = await self._cached_chat_completion(payload)
             content = data["choices"][0]["message"]["content"]
             result = extract_json_from_text(content)
             
@@ -767,12 +1032,8 @@ Last Tool Output: {last_tool_output}
             else:
                 revised_code = result.get("revised_code")
                 if revised_code:
-                    from ..utils.sanitizer import extract_code_from_markdown
-                    revised_code = extract_code_from_markdown(revised_code)
-                    
-                    # Double-check for leaked backticks or inline code style (if extract failed to strip them)
-                    if revised_code.startswith("`") and revised_code.endswith("`"):
-                        revised_code = revised_code.strip("`")
+                    m = _MD_STRIP.search(revised_code.strip())
+                    if m: revised_code = m.group(m.lastgroup).strip()
                 return False, revised_code, result.get("critique", "Unspecified issue")
                 
         except Exception as e:
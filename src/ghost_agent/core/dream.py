@@ -1,15 +1,17 @@
 # src/ghost_agent/core/dream.py
 
-import json
 import logging
 import asyncio
+import orjson
 from typing import List, Dict, Any
 
-from .prompts import SYSTEM_PROMPT
 from ..utils.logging import Icons, pretty_log
 
 logger = logging.getLogger("GhostAgent")
 
+# Memories per REM cycle; only this many ever reach the consolidation prompt
+_DREAM_BATCH = 50
+
 class Dreamer:
     """
     Active Memory Consolidation System.
@@ -26,10 +28,12 @@ class Dreamer:
         pretty_log("Dream Mode", "Entering REM cycle (Consolidating Memory & Extracting Heuristics)...", icon="💤")
         
         try:
-            results = self.memory.collection.get(
+            # Chroma reads are blocking SQLite calls; keep them off the event loop
+            results = await asyncio.to_thread(
+                self.memory.collection.get,
                 where={"type": "auto"},
-                limit=100,
-                include=["documents", "metadatas", "embeddings"]
+                limit=_DREAM_BATCH,
+                include=["documents"]  # ids always come back; metadata and vectors are never read here
             )
         except Exception as e:
             return f"Dream error: {e}"
@@ -40,8 +44,7 @@ class Dreamer:
         if len(documents) < 3:
             return "Not enough entropy to dream. (Need > 3 auto-memories to form heuristics)"
             
-        mem_list = [f"ID:{i} | {doc}" for i, doc in zip(ids, documents)]
-        mem_block = "\n".join(mem_list[:50])
+        mem_block = "\n".join(f"ID:{i} | {doc}" for i, doc in zip(ids, documents))
         pretty_log("Dream Mode", f"Analyzing {len(ids)} fragments for meta-patterns...", icon="🧠")
         
         prompt = f"""### IDENTITY
@@ -80,7 +83,11 @@ Return ONLY valid JSON. If no patterns exist, return empty lists.
             }
             data = await self.context.llm_client.chat_completion(payload)
             content = data["choices"][0]["message"]["content"]
-            result = json.loads(content)
+            # A cut-off or prose-padded reply cannot be a JSON object; fail fast instead of parsing it
+            tail = content.rstrip() if type(content) is str else ""
+            if not tail or tail[-1] not in "}]":
+                return "Dream failed: malformed JSON"
+            result = orjson.loads(content)
             
             consolidations = result.get("consolidations", [])
             heuristics = result.get("heuristics", [])
@@ -90,29 +97,33 @@ Return ONLY valid JSON. If no patterns exist, return empty lists.
                 
             ops_log = []
             
-            # Process Merged Facts
+            # Process Merged Facts: collect every merge, then apply them as one insert and one delete
+            new_facts, merged_away = [], []
             for item in consolidations:
                 synthesis = item.get("synthesis")
                 merged_ids = item.get("merged_ids", [])
                 stripped_ids = [mid.replace("ID:", "").strip() for mid in merged_ids]
                 
                 if synthesis and len(stripped_ids) > 1:
-                    # ADD new fact
-                    self.memory.add(synthesis, {"type": "consolidated_fact", "timestamp": "DREAM_CYCLE"})
-                    # DELETE old fragments
-                    self.memory.collection.delete(ids=stripped_ids)
+                    new_facts.append(synthesis)
+                    merged_away.extend(stripped_ids)
                     ops_log.append(f"Merged {len(stripped_ids)} items -> '{synthesis[:50]}...'")
                     pretty_log("Dream Merge", f"Consolidated {len(stripped_ids)} into 1: {synthesis[:40]}...", icon="✨")
 
+            if new_facts:
+                # ADD new facts before DELETING the old fragments, so a failed insert loses nothing.
+                # Both writes embed / reindex synchronously, so they run in a worker thread.
+                await asyncio.to_thread(self.memory.add_batch, new_facts, [{"type": "consolidated_fact", "timestamp": "DREAM_CYCLE"} for _ in new_facts])
+                await asyncio.to_thread(self.memory.collection.delete, ids=merged_away)
+
             # Process Heuristics (Save to Skills Playbook)
             if heuristics and self.context.skill_memory:
+                await asyncio.to_thread(
+                    self.context.skill_memory.learn_lessons,
+                    [("Dream Cycle Heuristic Extraction", "Inefficient or sub-optimal execution patterns.", h) for h in heuristics],
+                    memory_system=self.memory
+                )
                 for h in heuristics:
-                    self.context.skill_memory.learn_lesson(
-                        task="Dream Cycle Heuristic Extraction",
-                        mistake="Inefficient or sub-optimal execution patterns.",
-                        solution=h,
-                        memory_system=self.memory
-                    )
                     ops_log.append(f"Learned Heuristic: '{h[:50]}...'")
                     pretty_log("Dream Heuristic", f"Extracted Rule: {h[:40]}...", icon="💡")
                     
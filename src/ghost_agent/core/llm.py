@@ -1,17 +1,32 @@
-import json
 import asyncio
+import importlib.util
 import logging
 from typing import List, Dict, Any, Optional
 import httpx
+import orjson
 from ..utils.logging import Icons, pretty_log
 from ..utils.helpers import get_utc_timestamp
 
 logger = logging.getLogger("GhostAgent")
 
+# Faults worth waiting out: dropped connections (e.g. a llama.cpp restart) and a busy/still-loading server
+_RETRYABLE_ERRORS = (httpx.RemoteProtocolError, httpx.ReadError, httpx.WriteError, httpx.ConnectError)
+_RETRYABLE_STATUS = frozenset({429, 503})
+_MAX_ATTEMPTS = 10
+
+# OpenAI chunk framing for stream_openai: every frame shares the envelope up to the delta.
+# id and model are substituted already JSON-encoded, so they are escaped like any other string.
+_SSE_HEAD = b'data: {"id":%b,"object":"chat.completion.chunk","created":%d,"model":%b,"choices":[{"index":0,"delta":'
+_SSE_ROLE = b'{"role":"assistant"},"finish_reason":null}]}\n\n'
+_SSE_CONTENT_END = b',"finish_reason":null}]}\n\n'
+_SSE_STOP = b'{},"finish_reason":"stop"}]}\n\n'
+_SSE_DONE = b"data: [DONE]\n\n"
+
 class LLMClient:
     def __init__(self, upstream_url: str, tor_proxy: str = None):
         self.upstream_url = upstream_url
-        limits = httpx.Limits(max_keepalive_connections=5, max_connections=10)
+        # One pool is shared by chat, planning, embeddings and dream calls; keep warm connections around
+        limits = httpx.Limits(max_keepalive_connections=100, max_connections=200, keepalive_expiry=30.0)
         
         # Determine if we need to route through Tor
         # If upstream is NOT localhost, we force Tor usage
@@ -20,82 +35,79 @@ class LLMClient:
             proxy_url = tor_proxy.replace("socks5://", "socks5h://")
             pretty_log("LLM Connection", f"Routing upstream traffic via Tor ({proxy_url})", icon=Icons.SHIELD)
 
+        # Multiplexes concurrent calls over one TLS connection; needs the optional h2 package
+        http2 = importlib.util.find_spec("h2") is not None
+
         self.http_client = httpx.AsyncClient(
             base_url=upstream_url, 
             timeout=600.0, 
             limits=limits,
             proxy=proxy_url,
             follow_redirects=True,
-            http2=False
+            http2=http2
         )
 
     async def close(self):
         await self.http_client.aclose()
 
-    async def chat_completion(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+    @staticmethod
+    def _request_body(payload: Dict[str, Any], tools_blob: Optional[bytes] = None) -> Dict[str, Any]:
         """
-        Sends a chat completion request to the upstream LLM with robust retry logic.
+        httpx request kwargs for a chat payload. A pre-serialized tools schema is spliced into the
+        encoded body as-is, so the static tool definitions are not re-encoded on every turn.
+        """
+        if tools_blob is None:
+            return {"json": payload}
+        body = orjson.dumps({k: v for k, v in payload.items() if k != "tools"})
+        body = body[:-1] + (b',"tools":' if len(body) > 2 else b'"tools":') + tools_blob + b"}"
+        return {"content": body, "headers": {"Content-Type": "application/json"}}
+
+    async def _post_with_retry(self, path: str, request_kwargs: Dict[str, Any], label: str, max_wait: float) -> Dict[str, Any]:
         """
-        for attempt in range(10): 
+        POSTs to the upstream with exponential backoff on transient faults (see _RETRYABLE_ERRORS / _RETRYABLE_STATUS).
+        Any other error is logged and raised immediately.
+        """
+        for attempt in range(_MAX_ATTEMPTS):
             try:
-                resp = await self.http_client.post("/v1/chat/completions", json=payload)
+                resp = await self.http_client.post(path, **request_kwargs)
                 resp.raise_for_status()
                 return resp.json()
-            except (httpx.RemoteProtocolError, httpx.ReadError, httpx.WriteError, httpx.ConnectError) as e:
-                if attempt < 9:
-                    # Exponential backoff: 2, 4, 8, 16... capped at 30s
-                    wait_time = min(2 ** (attempt + 1), 30)
-                    pretty_log("Upstream Retry", f"[{attempt+1}/10] {type(e).__name__}. Retrying in {wait_time}s...", icon=Icons.RETRY)
-                    await asyncio.sleep(wait_time)
-                else:
-                    pretty_log("Upstream Failed", f"Failed after 10 attempts: {str(e)}", level="ERROR", icon=Icons.FAIL)
-                    raise
+            except _RETRYABLE_ERRORS as e:
+                error, reason = e, type(e).__name__
             except httpx.HTTPStatusError as e:
-                pretty_log("Upstream Error", f"HTTP {e.response.status_code}: {e.response.text}", level="ERROR", icon=Icons.FAIL)
-                raise
+                if e.response.status_code not in _RETRYABLE_STATUS:
+                    pretty_log(f"{label} Error", f"HTTP {e.response.status_code}: {e.response.text}", level="ERROR", icon=Icons.FAIL)
+                    raise
+                error, reason = e, f"HTTP {e.response.status_code}"
             except Exception as e:
-                pretty_log("Upstream Fatal", str(e), level="ERROR", icon=Icons.FAIL)
+                pretty_log(f"{label} Fatal", str(e), level="ERROR", icon=Icons.FAIL)
                 raise
+            if attempt == _MAX_ATTEMPTS - 1:
+                pretty_log(f"{label} Failed", f"Failed after {_MAX_ATTEMPTS} attempts: {str(error)}", level="ERROR", icon=Icons.FAIL)
+                raise error
+            wait_time = min(2 ** (attempt + 1), max_wait)
+            pretty_log(f"{label} Retry", f"[{attempt+1}/{_MAX_ATTEMPTS}] {reason}. Retrying in {wait_time}s...", icon=Icons.RETRY)
+            await asyncio.sleep(wait_time)
+
+    async def chat_completion(self, payload: Dict[str, Any], tools_blob: Optional[bytes] = None) -> Dict[str, Any]:
+        """
+        Sends a chat completion request to the upstream LLM with robust retry logic.
+        tools_blob, when given, is the JSON-encoded value of payload["tools"].
+        """
+        # Encoded once; retries resend the same body
+        return await self._post_with_retry("/v1/chat/completions", self._request_body(payload, tools_blob), "Upstream", max_wait=30)
 
     async def get_embeddings(self, texts: List[str]) -> List[List[float]]:
         """
         Fetches embeddings from the upstream LLM with robust retry logic.
         """
-        payload = {"input": texts, "model": "default"}
-        for attempt in range(10): 
-            try:
-                resp = await self.http_client.post("/v1/embeddings", json=payload)
-                resp.raise_for_status()
-                data = resp.json()
-                return [item["embedding"] for item in data["data"]]
-            except (httpx.RemoteProtocolError, httpx.ReadError, httpx.WriteError, httpx.ConnectError) as e:
-                if attempt < 9:
-                    wait_time = min(2 ** (attempt + 1), 20)
-                    await asyncio.sleep(wait_time)
-                else:
-                    pretty_log("Embedding Failed", f"Failed after 10 attempts: {str(e)}", level="ERROR", icon=Icons.FAIL)
-                    raise
-            except Exception as e:
-                pretty_log("Embedding Fatal", str(e), level="ERROR", icon=Icons.FAIL)
-                raise
+        data = await self._post_with_retry("/v1/embeddings", {"json": {"input": texts, "model": "default"}}, "Embedding", max_wait=20)
+        return [item["embedding"] for item in data["data"]]
 
     async def stream_openai(self, model: str, content: str, created_time: int, req_id: str):
-        chunk_id = f"chatcmpl-{req_id}"
-        start_chunk = {
-            "id": chunk_id, "object": "chat.completion.chunk", "created": created_time,
-            "model": model, "choices": [{"index": 0, "delta": {"role": "assistant"}, "finish_reason": None}]
-        }
-        yield f"data: {json.dumps(start_chunk)}\n\n".encode('utf-8')
-
-        content_chunk = {
-            "id": chunk_id, "object": "chat.completion.chunk", "created": created_time,
-            "model": model, "choices": [{"index": 0, "delta": {"content": content}, "finish_reason": None}]
-        }
-        yield f"data: {json.dumps(content_chunk)}\n\n".encode('utf-8')
-
-        stop_chunk = {
-            "id": chunk_id, "object": "chat.completion.chunk", "created": created_time,
-            "model": model, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]
-        }
-        yield f"data: {json.dumps(stop_chunk)}\n\n".encode('utf-8')
-        yield b"data: [DONE]\n\n"
\ No newline at end of file
+        # Only the content delta is serialized per call
+        head = _SSE_HEAD % (orjson.dumps(f"chatcmpl-{req_id}"), created_time, orjson.dumps(model))
+        yield head + _SSE_ROLE
+        yield head + orjson.dumps({"content": content}) + _SSE_CONTENT_END
+        yield head + _SSE_STOP
+        yield _SSE_DONE
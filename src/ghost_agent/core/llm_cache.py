@@ -0,0 +1,57 @@
+# src/ghost_agent/core/llm_cache.py
+
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import orjson
+
+class LLMCache:
+    """
+    In-memory LRU cache for deterministic (temperature == 0) chat completions.
+    Sampled completions are never cached, so retries at higher temperature still get fresh output.
+    """
+    KEY_FIELDS = ("model", "messages", "temperature", "tools", "response_format", "max_tokens")
+
+    def __init__(self, max_entries: int = 256, ttl: float = 3600.0):
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def make_key(self, payload: Dict[str, Any]) -> Optional[str]:
+        if payload.get("temperature") != 0 or payload.get("stream"):
+            return None
+        try:
+            blob = orjson.dumps({k: payload.get(k) for k in self.KEY_FIELDS}, option=orjson.OPT_SORT_KEYS)
+        except TypeError:
+            return None
+        return hashlib.sha256(blob).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        stored_at, value = entry
+        if time.monotonic() - stored_at > self.ttl:
+            del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any):
+        self._data[key] = (time.monotonic(), value)
+        self._data.move_to_end(key)
+        if len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def stats(self) -> str:
+        return f"{self.hits} hits / {self.misses} misses ({len(self._data)} entries)"
+
+    def clear(self):
+        self._data.clear()
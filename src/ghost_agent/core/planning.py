@@ -1,10 +1,12 @@
 # src/ghost_agent/core/planning.py
 
-import json
-import uuid
+import secrets
+from collections import deque
 from enum import Enum
 from typing import List, Dict, Optional, Any
-from dataclasses import dataclass, field, asdict
+from dataclasses import dataclass, field
+
+import orjson
 
 class TaskStatus(str, Enum):
     PENDING = "PENDING"
@@ -14,7 +16,7 @@ class TaskStatus(str, Enum):
     FAILED = "FAILED"
     BLOCKED = "BLOCKED"
 
-@dataclass
+@dataclass(slots=True)
 class TaskNode:
     id: str
     description: str
@@ -22,111 +24,153 @@ class TaskNode:
     parent_id: Optional[str] = None
     children: List[str] = field(default_factory=list)
     result_summary: str = ""
+    pending_children: int = 0  # children not yet DONE; maintained by TaskTree
 
     def to_dict(self):
-        return asdict(self)
+        # Same keys as dataclasses.asdict, without its deepcopy walk; status is emitted as its plain value
+        return {
+            "id": self.id,
+            "description": self.description,
+            "status": self.status.value,
+            "parent_id": self.parent_id,
+            "children": list(self.children),
+            "result_summary": self.result_summary,
+            "pending_children": self.pending_children,
+        }
+
+# Leaf statuses get_active_node() picks from, most urgent first
+_ACTIVE_PRIORITY = {
+    TaskStatus.FAILED: 0,
+    TaskStatus.IN_PROGRESS: 1,
+    TaskStatus.READY: 2,
+    TaskStatus.PENDING: 2,
+}
 
 class TaskTree:
     def __init__(self):
         self.nodes: Dict[str, TaskNode] = {}
         self.root_id: Optional[str] = None
+        # render()/to_json() results, dropped by every mutation that goes through the tree
+        self._render_cache: Optional[str] = None
+        self._json_cache: Optional[Dict[str, Any]] = None
+
+    def _invalidate(self):
+        self._render_cache = None
+        self._json_cache = None
 
     def add_task(self, description: str, parent_id: Optional[str] = None, status: TaskStatus = TaskStatus.PENDING) -> str:
-        node_id = str(uuid.uuid4())[:4]
-        node = TaskNode(id=node_id, description=description, status=status, parent_id=parent_id)
-        self.nodes[node_id] = node
-        
-        if parent_id:
-            if parent_id in self.nodes:
-                self.nodes[parent_id].children.append(node_id)
-        elif self.root_id is None:
-            self.root_id = node_id
-            
+        node_id = self._new_id()
+        self._attach(TaskNode(id=node_id, description=description, status=status, parent_id=parent_id))
+        return node_id
+
+    def _new_id(self) -> str:
+        # 4 hex chars keep ids short for the LLM; re-draw on the rare clash within this tree
+        node_id = secrets.token_hex(2)
+        while node_id in self.nodes:
+            node_id = secrets.token_hex(2)
         return node_id
 
+    def _attach(self, node: TaskNode):
+        """Registers a node and links it under its parent (or as the root if there is none yet)."""
+        self._invalidate()
+        self.nodes[node.id] = node
+        if node.parent_id:
+            parent = self.nodes.get(node.parent_id)
+            if parent:
+                parent.children.append(node.id)
+                if node.status != TaskStatus.DONE:
+                    parent.pending_children += 1
+        elif self.root_id is None:
+            self.root_id = node.id
+
     def update_status(self, task_id: str, status: TaskStatus, result: str = ""):
         if task_id in self.nodes:
-            self.nodes[task_id].status = status
+            self._invalidate()
+            node = self.nodes[task_id]
+            was_done = node.status == TaskStatus.DONE
+            node.status = status
             if result:
-                self.nodes[task_id].result_summary = result
+                node.result_summary = result
+            parent = self.nodes.get(node.parent_id) if node.parent_id else None
+            if parent and was_done != (status == TaskStatus.DONE):
+                parent.pending_children += 1 if was_done else -1
             if status == TaskStatus.DONE:
-                self._check_parent_completion(self.nodes[task_id].parent_id)
+                self._check_parent_completion(node.parent_id)
                 
-    def _check_parent_completion(self, parent_id: str, visited: set = None):
-        if visited is None: visited = set()
-        if not parent_id or parent_id not in self.nodes or parent_id in visited: return
-        visited.add(parent_id)
-        
-        parent = self.nodes[parent_id]
-        if not parent.children: return
-        
-        all_done = all(self.nodes.get(child_id) and self.nodes[child_id].status == TaskStatus.DONE for child_id in parent.children)
-        if all_done:
-            parent.status = TaskStatus.DONE
-            self._check_parent_completion(parent.parent_id, visited)
+    def _check_parent_completion(self, parent_id: str):
+        # Walk up the ancestor chain, completing each parent with no pending children left
+        visited = set()
+        while parent_id and parent_id in self.nodes and parent_id not in visited:
+            visited.add(parent_id)
+            parent = self.nodes[parent_id]
+            if not parent.children or parent.pending_children > 0: return
+            
+            if parent.status != TaskStatus.DONE:
+                parent.status = TaskStatus.DONE
+                grandparent = self.nodes.get(parent.parent_id) if parent.parent_id else None
+                if grandparent: grandparent.pending_children -= 1
+            parent_id = parent.parent_id
 
     def get_active_node(self) -> Optional[TaskNode]:
         if not self.root_id: return None
         
-        def find_status(node_id: str, target_statuses: List[TaskStatus], visited: set) -> Optional[TaskNode]:
-            if node_id in visited: return None
+        # One depth-first, left-to-right pass; the first leaf of the best priority wins
+        best, best_rank = None, len(_ACTIVE_PRIORITY)
+        stack, visited = [self.root_id], set()
+        while stack:
+            node_id = stack.pop()
+            if node_id in visited: continue
             visited.add(node_id)
             
             node = self.nodes.get(node_id)
-            if not node: return None
-            for child_id in node.children:
-                found = find_status(child_id, target_statuses, visited)
-                if found: return found
-                
-            if node.status in target_statuses and not node.children: 
-                return node
-            return None
-
-        failed = find_status(self.root_id, [TaskStatus.FAILED], set())
-        if failed: return failed
-        
-        in_prog = find_status(self.root_id, [TaskStatus.IN_PROGRESS], set())
-        if in_prog: return in_prog
-        
-        ready = find_status(self.root_id, [TaskStatus.READY, TaskStatus.PENDING], set()) 
-        if ready: return ready
-        
-        return None
+            if not node: continue
+            if node.children:
+                stack.extend(reversed(node.children))
+                continue
+            rank = _ACTIVE_PRIORITY.get(node.status, best_rank)
+            if rank < best_rank:
+                best, best_rank = node, rank
+                if rank == 0: break
+        return best
 
     def render(self) -> str:
         if not self.root_id: return "No Plan."
+        if self._render_cache is not None: return self._render_cache
         lines = []
-        self._render_node(self.root_id, 0, lines, set())
-        return "\n".join(lines)
-
-    def _render_node(self, node_id: str, depth: int, lines: List[str], visited: set):
-        if node_id in visited or depth > 20: return
-        visited.add(node_id)
-        
-        node = self.nodes.get(node_id)
-        if not node: return
-        indent = "  " * depth
-        icon = {
-            "PENDING": "⏳", "READY": "🟢", "IN_PROGRESS": "🔄",
-            "DONE": "✅", "FAILED": "❌", "BLOCKED": "🛑"
-        }.get(node.status.value, "➖")
-        
-        lines.append(f"{indent}{icon} [{node.id}] {node.description} ({node.status.value})")
-        for child_id in node.children:
-            self._render_node(child_id, depth + 1, lines, visited)
+        stack, visited = [(self.root_id, 0)], set()
+        while stack:
+            node_id, depth = stack.pop()
+            if node_id in visited or depth > 20: continue
+            visited.add(node_id)
+            
+            node = self.nodes.get(node_id)
+            if not node: continue
+            indent = "  " * depth
+            icon = {
+                "PENDING": "⏳", "READY": "🟢", "IN_PROGRESS": "🔄",
+                "DONE": "✅", "FAILED": "❌", "BLOCKED": "🛑"
+            }.get(node.status.value, "➖")
+            
+            lines.append(f"{indent}{icon} [{node.id}] {node.description} ({node.status.value})")
+            stack.extend((child_id, depth + 1) for child_id in reversed(node.children))
+        self._render_cache = "\n".join(lines)
+        return self._render_cache
 
     def load_from_json(self, json_data: Any):
         if not json_data: return
         
         self.nodes = {}
         self.root_id = None
+        self._invalidate()
         
-        def traverse(node_data: Any, parent_id: Optional[str] = None, visited: set = None):
-            if visited is None: visited = set()
-            if not isinstance(node_data, dict): return
+        # Breadth-first; siblings are attached in their listed order
+        queue, visited = deque([(json_data, None)]), set()
+        while queue:
+            node_data, parent_id = queue.popleft()
+            if not isinstance(node_data, dict): continue
             
-            node_id = node_data.get("id", str(uuid.uuid4())[:4])
-            if node_id in visited: return
+            node_id = node_data["id"] if "id" in node_data else self._new_id()
+            if node_id in visited: continue
             visited.add(node_id)
             desc = node_data.get("description", "Unknown Task")
             status_str = node_data.get("status", "PENDING").upper()
@@ -135,33 +179,39 @@ class TaskTree:
             except KeyError:
                 status = TaskStatus.PENDING
                 
-            node = TaskNode(id=node_id, description=desc, status=status, parent_id=parent_id, children=[])
-            self.nodes[node_id] = node
-            
-            if not parent_id and not self.root_id:
-                self.root_id = node_id
-            elif parent_id:
-                if parent_id in self.nodes:
-                    self.nodes[parent_id].children.append(node_id)
+            self._attach(TaskNode(id=node_id, description=desc, status=status, parent_id=parent_id, children=[]))
                     
             children_data = node_data.get("children", [])
             if isinstance(children_data, list):
-                for child in children_data:
-                    traverse(child, node_id, visited)
-                    
-        traverse(json_data)
+                queue.extend((child, node_id) for child in children_data)
 
     def to_json(self) -> Dict[str, Any]:
+        """Nested plan dict; the same object is returned until the tree changes, so treat it as read-only."""
         if not self.root_id: return {}
+        if self._json_cache is not None: return self._json_cache
         
-        def serialize(node_id: str) -> Dict[str, Any]:
+        # Each popped node is appended to its parent's (already emitted) children list
+        root: List[Dict[str, Any]] = []
+        stack, visited = [(self.root_id, root)], set()
+        while stack:
+            node_id, siblings = stack.pop()
+            if node_id in visited or node_id not in self.nodes: continue
+            visited.add(node_id)
+            
             node = self.nodes[node_id]
-            return {
+            children: List[Dict[str, Any]] = []
+            siblings.append({
                 "id": node.id,
                 "description": node.description,
                 "status": node.status.value,
-                "children": [serialize(cid) for cid in node.children]
-            }
+                "children": children
+            })
+            stack.extend((cid, children) for cid in reversed(node.children))
             
-        return serialize(self.root_id)
+        self._json_cache = root[0]
+        return self._json_cache
+
+    def to_json_bytes(self) -> bytes:
+        """to_json() encoded with orjson, for callers that persist or send the plan (orjson caps nesting at 254 levels)."""
+        return orjson.dumps(self.to_json())
         
\ No newline at end of file
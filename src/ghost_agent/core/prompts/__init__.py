@@ -0,0 +1,134 @@
+# src/ghost_agent/core/prompts/__init__.py
+
+import os
+import re
+import sys
+from collections.abc import Mapping
+from functools import lru_cache
+from importlib import resources
+from typing import Tuple
+
+_PLACEHOLDER_RE = re.compile(r"\{\{(\w+)\}\}")
+
+@lru_cache(maxsize=32)
+def _split_template(template: str) -> Tuple[str, ...]:
+    # Literal chunks at even indexes, placeholder names at odd ones; parsed once per template
+    return tuple(_PLACEHOLDER_RE.split(template))
+
+def render_prompt(template: str, **values: str) -> str:
+    """Fills {{NAME}} placeholders in one pass; placeholders without a value are left as-is."""
+    parts = list(_split_template(template))
+    for i in range(1, len(parts), 2):
+        name = parts[i]
+        parts[i] = values[name] if name in values else "{{" + name + "}}"
+    return "".join(parts)
+
+# Prompt bodies live next to this module as <name>.txt and are read on first access only,
+# so a process that never plans, critiques or fact-checks never loads those prompts.
+# The persona prompts (system, code, dba) are fully static; the per-request time and profile are sent
+# separately (REQUEST_CONTEXT_PROMPT) next to the newest user turn, so the persona prompt and the turns
+# before it form an identical prefix on every request and the upstream's prompt (KV) cache can reuse it.
+_PROMPT_FILES = {
+    "SYSTEM_PROMPT": "system",
+    "CODE_SYSTEM_PROMPT": "code",
+    "DBA_SYSTEM_PROMPT": "dba",
+    "PLANNING_SYSTEM_PROMPT": "planning",
+    "CRITIC_SYSTEM_PROMPT": "critic",
+    "FACT_CHECK_SYSTEM_PROMPT": "fact_check",
+    "SMART_MEMORY_PROMPT": "smart_memory",
+    "REQUEST_CONTEXT_PROMPT": "context",
+}
+
+def _read(name: str) -> str:
+    return resources.files(__name__).joinpath(f"{name}.txt").read_text(encoding="utf-8")
+
+# Smart-memory scoring rubric: (score, label, examples, action). Rendered into smart_memory.txt
+_SCORING = (
+    (1.0, "EXPLICIT IDENTITY", "Names, locations, professions", "TRIGGERS PROFILE UPDATE"),
+    (0.9, "INFERRED PREFERENCES", '"I prefer async Python"', "TRIGGERS PROFILE UPDATE"),
+    (0.8, "PROJECT CONTEXT", "Current complex bugs, library versions", None),
+    (0.1, "EPHEMERAL CHIT-CHAT", None, "DISCARD"),
+)
+
+def _scoring_matrix() -> str:
+    rows = []
+    for score, label, examples, action in _SCORING:
+        row = f"- {score:.1f} : {label}"
+        if examples: row += f" ({examples})."
+        if action: row += f" -> {action}."
+        rows.append(row)
+    return "\n".join(rows)
+
+def _tool_map() -> str:
+    from ...tools.registry import tool_trigger_map  # deferred: the registry imports every tool module
+    return tool_trigger_map()
+
+# Placeholders filled once at load time, as opposed to the per-request ones left for render_prompt
+_LOAD_TIME_VALUES = {
+    "system": {"TOOL_MAP": _tool_map},
+    "smart_memory": {"SCORING_MATRIX": _scoring_matrix},
+}
+
+@lru_cache(maxsize=None)
+def get(name: str) -> str:
+    """Returns the prompt stored in <name>.txt (e.g. "system", "critic")."""
+    text = _read(name)
+    if name in _LOAD_TIME_VALUES:
+        text = render_prompt(text, **{k: build() for k, build in _LOAD_TIME_VALUES[name].items()})
+    # Interned, so every holder shares one object and equality checks against it short-circuit on identity
+    return sys.intern(text)
+
+class _PromptTable(Mapping):
+    """Read-only, lazily loaded view of every prompt by file name (PROMPTS["system"], PROMPTS["critic"], ...)."""
+    __slots__ = ()
+
+    def __getitem__(self, name: str) -> str:
+        if name not in _PROMPT_NAMES:
+            raise KeyError(name)
+        return get(name)
+
+    def __iter__(self):
+        return iter(_PROMPT_NAMES)
+
+    def __len__(self) -> int:
+        return len(_PROMPT_NAMES)
+
+_PROMPT_NAMES = tuple(_PROMPT_FILES.values())
+PROMPTS: Mapping = _PromptTable()
+
+def __getattr__(attr: str) -> str:
+    # Keeps `from .prompts import SYSTEM_PROMPT` working; the first access binds the text as a
+    # plain module global, so later lookups never come back here
+    if attr in _PROMPT_FILES:
+        value = globals()[attr] = get(_PROMPT_FILES[attr])
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {attr!r}")
+
+_PERSONA_PROMPTS = ("system", "code", "dba")
+
+def persona_prefixes() -> Tuple[str, ...]:
+    """The persona prompts, i.e. the static opening of every main-loop system message."""
+    return tuple(get(name) for name in _PERSONA_PROMPTS)
+
+def validate_prompts(min_tokens: int = 0) -> None:
+    """
+    Checks the invariants the upstream's prefix cache relies on: every persona prompt is fully
+    rendered (a leftover placeholder would vary per request) and at least min_tokens long.
+    Raises ValueError naming each offending prompt.
+    """
+    from ...utils.token_counter import estimate_tokens  # deferred: pulls in transformers
+    problems = []
+    for name in _PERSONA_PROMPTS:
+        text = get(name)
+        leftover = _PLACEHOLDER_RE.findall(text)
+        if leftover:
+            problems.append(f"{name}: unrendered placeholders {leftover}")
+        if min_tokens and (count := estimate_tokens(text)) < min_tokens:
+            problems.append(f"{name}: {count} tokens < {min_tokens}")
+    if problems:
+        raise ValueError("Prompt validation failed: " + "; ".join(problems))
+
+# Opt-in (CI) check, so a prompt edit that breaks the cacheable prefix fails at import rather than
+# silently costing prefill time. llama.cpp reuses any prefix length, so the floor defaults to 0.
+if os.environ.get("GHOST_VALIDATE_PROMPTS"):
+    validate_prompts(int(os.environ.get("GHOST_MIN_CACHE_TOKENS", "0")))
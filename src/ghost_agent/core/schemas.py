@@ -0,0 +1,95 @@
+# src/ghost_agent/core/schemas.py
+
+from typing import Any, Dict
+
+# Structured-output contracts for the JSON side calls (planner, critic, smart memory, post-mortem).
+# Sent as OpenAI-style `response_format` so the upstream constrains decoding to the schema;
+# the prompts then only describe what each field means instead of carrying a full JSON example.
+
+_TASK_STATUSES = ["PENDING", "READY", "IN_PROGRESS", "DONE", "FAILED", "BLOCKED"]
+
+def _json_schema_format(name: str, schema: Dict[str, Any]) -> Dict[str, Any]:
+    return {"type": "json_schema", "json_schema": {"name": name, "schema": schema}}
+
+PLAN_UPDATE_FORMAT = _json_schema_format("PlanUpdate", {
+    "type": "object",
+    "properties": {
+        "thought": {"type": "string"},
+        "tree_update": {"$ref": "#/$defs/task"},
+        "next_action_id": {"type": "string"},
+    },
+    "required": ["thought", "tree_update", "next_action_id"],
+    "$defs": {
+        "task": {
+            "type": "object",
+            "properties": {
+                "id": {"type": "string"},
+                "description": {"type": "string"},
+                "status": {"type": "string", "enum": _TASK_STATUSES},
+                "children": {"type": "array", "items": {"$ref": "#/$defs/task"}},
+            },
+            "required": ["id", "description", "status"],
+        }
+    },
+})
+
+CRITIC_VERDICT_FORMAT = _json_schema_format("CriticVerdict", {
+    "type": "object",
+    "properties": {
+        "status": {"type": "string", "enum": ["APPROVED", "REVISED"]},
+        "critique": {"type": "string"},
+        "revised_code": {"type": ["string", "null"]},
+    },
+    "required": ["status", "critique", "revised_code"],
+})
+
+MEMORY_SCORE_FORMAT = _json_schema_format("MemoryScore", {
+    "type": "object",
+    "properties": {
+        "score": {"type": "number", "minimum": 0, "maximum": 1},
+        "fact": {"type": "string"},
+        "profile_update": {
+            "anyOf": [
+                {
+                    "type": "object",
+                    "properties": {
+                        "category": {"type": "string"},
+                        "key": {"type": "string"},
+                        "value": {"type": "string"},
+                    },
+                    "required": ["category", "key", "value"],
+                },
+                {"type": "null"},
+            ]
+        },
+    },
+    "required": ["score", "fact", "profile_update"],
+})
+
+# A post-mortem lesson, or null when the interaction taught nothing new
+_LESSON = {
+    "anyOf": [
+        {
+            "type": "object",
+            "properties": {
+                "task": {"type": "string"},
+                "mistake": {"type": "string"},
+                "solution": {"type": "string"},
+            },
+            "required": ["task", "mistake", "solution"],
+        },
+        {"type": "null"},
+    ]
+}
+
+FINAL_ANSWER_FORMAT = _json_schema_format("FinalAnswer", {
+    "type": "object",
+    "properties": {"final_answer": {"type": "string"}, "lesson": _LESSON},
+    "required": ["final_answer", "lesson"],
+})
+
+LESSON_REPORT_FORMAT = _json_schema_format("LessonReport", {
+    "type": "object",
+    "properties": {"lesson": _LESSON},
+    "required": ["lesson"],
+})
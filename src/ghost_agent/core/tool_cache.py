@@ -0,0 +1,46 @@
+# src/ghost_agent/core/tool_cache.py
+
+import re
+import time
+from typing import Any, Dict, Optional, Tuple
+
+_WS_RE = re.compile(r"\s+")
+
+class ToolResultCache:
+    """
+    Result cache for read-only research tools.
+    Lookups match on normalized arguments only (whitespace and key order insensitive). Values keep
+    their case, and there is no similarity matching: "python 3.12" and "python 3.13" are different queries.
+    """
+    CACHEABLE_TOOLS = frozenset({"web_search", "deep_research"})
+
+    def __init__(self, ttl: float = 900.0, max_entries: int = 128):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: Dict[str, Tuple[float, str]] = {}  # key -> (stored_at, result)
+
+    @staticmethod
+    def normalize(fname: str, args: Dict[str, Any]) -> str:
+        parts = [f"{k}={_WS_RE.sub(' ', str(args[k])).strip()}" for k in sorted(args)]
+        return f"{fname}|" + "|".join(parts)
+
+    def lookup(self, fname: str, args: Dict[str, Any]) -> Optional[str]:
+        key = self.normalize(fname, args)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic() - self.ttl:
+            del self._entries[key]
+            return None
+        return entry[1]
+
+    def store(self, fname: str, args: Dict[str, Any], result: str):
+        key = self.normalize(fname, args)
+        self._entries.pop(key, None)  # re-inserted as the newest entry
+        self._entries[key] = (time.monotonic(), result)
+        if len(self._entries) > self.max_entries:
+            for k in list(self._entries)[:len(self._entries) - self.max_entries]:
+                del self._entries[k]
+
+    def clear(self):
+        self._entries.clear()
@@ -16,13 +16,14 @@ from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
 from .api.app import create_app
 from .core.agent import GhostAgent, GhostContext
 from .core.llm import LLMClient
+from .core.prompts import persona_prefixes
 from .memory.vector import VectorMemory
 from .memory.profile import ProfileMemory
 from .memory.scratchpad import Scratchpad
 from .memory.skills import SkillMemory
 from .sandbox.docker import DockerSandbox
 from .utils.logging import setup_logging, pretty_log, Icons
-from .utils.token_counter import load_tokenizer
+from .utils.token_counter import load_tokenizer, register_static_prefix
 from .tools import tasks
 from .tools.registry import TOOL_DEFINITIONS
 
@@ -90,28 +91,37 @@ async def lifespan(app):
     
     pretty_log("System Boot", "Initializing components", icon=Icons.SYSTEM_BOOT)
 
-    if importlib.util.find_spec("docker"):
+    # The three subsystems are independent and mostly blocking I/O (Docker API, disk, SQLite + HNSW load),
+    # so they start side by side on worker threads; each one logs and survives its own failure
+    async def init_sandbox():
+        if not importlib.util.find_spec("docker"): return
         try:
-            context.sandbox_manager = DockerSandbox(context.sandbox_dir, context.tor_proxy)
+            context.sandbox_manager = await asyncio.to_thread(DockerSandbox, context.sandbox_dir, context.tor_proxy)
             await asyncio.to_thread(context.sandbox_manager.ensure_running)
         except Exception as e:
             pretty_log("Sandbox Failed", str(e), level="ERROR", icon=Icons.FAIL)
 
-    try:
-        context.profile_memory = ProfileMemory(context.memory_dir)
-    except Exception as e:
-        pretty_log("Identity Failed", str(e), level="ERROR", icon=Icons.FAIL)
+    async def init_profile():
+        try:
+            context.profile_memory = await asyncio.to_thread(ProfileMemory, context.memory_dir)
+        except Exception as e:
+            pretty_log("Identity Failed", str(e), level="ERROR", icon=Icons.FAIL)
 
-    if not args.no_memory:
+    async def init_memory():
+        if args.no_memory: return None
         try:
-            context.memory_system = VectorMemory(context.memory_dir, args.upstream_url, context.tor_proxy)
+            context.memory_system = await asyncio.to_thread(VectorMemory, context.memory_dir, args.upstream_url, context.tor_proxy)
             if context.memory_system.collection:
                 count = context.memory_system.collection.count()
                 pretty_log("Memory Ready", f"{count} fragments indexed", icon=Icons.MEM_READ)
-            else:
-                pretty_log("Memory Offline", "Collection not loaded", level="WARNING", icon=Icons.WARN)
+                # Not awaited: boot carries on while the index pages in
+                return asyncio.create_task(asyncio.to_thread(context.memory_system.warm_up))
+            pretty_log("Memory Offline", "Collection not loaded", level="WARNING", icon=Icons.WARN)
         except Exception as e:
             pretty_log("Memory Failed", str(e), level="ERROR", icon=Icons.FAIL)
+        return None
+
+    _, _, warm_task = await asyncio.gather(init_sandbox(), init_profile(), init_memory())
 
     # Scheduler setup
     db_url = f"sqlite:///{(context.memory_dir / 'ghost.db').absolute()}"
@@ -146,6 +156,9 @@ async def lifespan(app):
 
     yield
     
+    if warm_task and not warm_task.done():
+        # Let the warm-up thread finish before the process tears the collection down
+        await asyncio.wait([warm_task])
     if context.scheduler.running:
         context.scheduler.shutdown()
     await context.llm_client.close()
@@ -161,6 +174,9 @@ def main():
     
     setup_logging(str(log_file), args.debug, args.daemon, args.verbose)
     load_tokenizer(tokenizer_path)
+    # The persona prompts' static rules are counted once; each turn only tokenizes the dynamic tail
+    for prefix in persona_prefixes():
+        register_static_prefix(prefix)
     
     # Ensure directories exist
     sandbox_dir.mkdir(parents=True, exist_ok=True)
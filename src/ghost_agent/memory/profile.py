@@ -1,25 +1,54 @@
-import json
+import copy
+import os
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Optional, Tuple
+import orjson
 from ..utils.logging import pretty_log
 
+def _default_profile() -> Dict[str, Any]:
+    return {"root": {"name": "User"}, "relationships": {}, "interests": {}, "assets": {}}
+
 class ProfileMemory:
     def __init__(self, path: Path):
         self.file_path = path / "user_profile.json"
+        # Parsed profile plus the (mtime_ns, size) of the file it came from; an edit made
+        # outside this instance changes the stamp and forces a re-read
+        self._cache: Optional[Dict[str, Any]] = None
+        self._stamp: Optional[Tuple[int, int]] = None
+        self._context: Optional[str] = None
         if not self.file_path.exists():
-            self.save({"root": {"name": "User"}, "relationships": {}, "interests": {}, "assets": {}})
+            self.save(_default_profile())
+
+    def _data(self) -> Dict[str, Any]:
+        """The live profile dict; only this class mutates it, always followed by save()."""
+        try:
+            st = self.file_path.stat()
+            stamp = (st.st_mtime_ns, st.st_size)
+            if self._cache is None or stamp != self._stamp:
+                self._cache, self._stamp, self._context = orjson.loads(self.file_path.read_bytes()), stamp, None
+            return self._cache
+        except Exception:
+            return _default_profile()
 
     def load(self) -> Dict[str, Any]:
-        try: 
-            return json.loads(self.file_path.read_text())
-        except: 
-            return {"root": {"name": "User"}, "relationships": {}, "interests": {}, "assets": {}}
+        # A copy: callers iterate it while calling delete()
+        return copy.deepcopy(self._data())
 
     def save(self, data: Dict[str, Any]):
-        self.file_path.write_text(json.dumps(data, indent=2))
+        # Written to a sibling temp file and swapped in, so a crash never leaves a half-written profile
+        tmp = self.file_path.with_suffix(".json.tmp")
+        try:
+            tmp.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+            os.replace(tmp, self.file_path)
+        except Exception:
+            # update()/delete() already mutated the cached dict; drop it so the next read matches the disk
+            self._cache = None
+            raise
+        st = self.file_path.stat()
+        self._cache, self._stamp, self._context = data, (st.st_mtime_ns, st.st_size), None
 
     def update(self, category: str, key: str, value: Any):
-        data = self.load()
+        data = self._data()
         cat = str(category).strip().lower()
         k = str(key).strip().lower()
         v = str(value).strip()
@@ -50,7 +79,7 @@ class ProfileMemory:
         return f"Synchronized: {cat}.{target_key} = {v}"
 
     def delete(self, category: str, key: str) -> str:
-        data = self.load()
+        data = self._data()
         cat = str(category).strip().lower()
         k = str(key).strip().lower()
 
@@ -65,7 +94,9 @@ class ProfileMemory:
         return f"Profile key not found: {cat}.{k}"
 
     def get_context_string(self) -> str:
-        data = self.load()
+        data = self._data()
+        if self._context is not None and data is self._cache:
+            return self._context
         lines = []
         for key, val in data.items():
             if not val: continue
@@ -78,4 +109,7 @@ class ProfileMemory:
                 lines.append(f"## {label}: " + ", ".join([str(i) for i in val]))
             else:
                 lines.append(f"{label}: {val}")
-        return "\n".join(lines)
\ No newline at end of file
+        context = "\n".join(lines)
+        if data is self._cache:
+            self._context = context
+        return context
\ No newline at end of file
@@ -1,36 +1,85 @@
-import json
+import itertools
 import logging
+import os
+import threading
+from collections import deque
 from pathlib import Path
+from typing import List, Tuple
 from datetime import datetime
+import orjson
 from ..utils.logging import Icons, pretty_log
 
 logger = logging.getLogger("GhostAgent")
 
+# Lessons kept as the recent-lessons fallback (newest first)
+_PLAYBOOK_SIZE = 50
+# The JSONL log is rewritten down to the kept lessons once it grows past this many lines
+_COMPACT_AT = 2 * _PLAYBOOK_SIZE
+
 class SkillMemory:
     def __init__(self, memory_dir: Path):
-        self.file_path = memory_dir / "skills_playbook.json"
-        if not self.file_path.exists():
-            self.file_path.write_text(json.dumps([]))
+        # Append-only log, oldest lesson first; the newest _PLAYBOOK_SIZE are held in memory
+        self.file_path = memory_dir / "skills_playbook.jsonl"
+        self._lessons = deque(maxlen=_PLAYBOOK_SIZE)
+        self._lines = 0
+        # learn_lessons runs both on the event loop and in worker threads (dream mode)
+        self._lock = threading.Lock()
+        legacy = memory_dir / "skills_playbook.json"
+        if self.file_path.exists():
+            for line in self.file_path.read_bytes().splitlines():
+                try:
+                    self._lessons.appendleft(orjson.loads(line))
+                except orjson.JSONDecodeError:
+                    continue  # torn final write from a crash
+                self._lines += 1
+        elif legacy.exists():
+            # One-time migration from the old whole-file JSON playbook (stored newest first)
+            try:
+                self._lessons.extend(orjson.loads(legacy.read_bytes()))
+            except orjson.JSONDecodeError as e:
+                logger.error(f"Could not migrate {legacy.name}: {e}")
+            self._compact()
+        else:
+            self.file_path.touch()
+
+    def _compact(self):
+        tmp = self.file_path.with_suffix(".jsonl.tmp")
+        tmp.write_bytes(b"".join(orjson.dumps(l) + b"\n" for l in reversed(self._lessons)))
+        os.replace(tmp, self.file_path)
+        self._lines = len(self._lessons)
 
     def learn_lesson(self, task: str, mistake: str, solution: str, memory_system=None):
+        self.learn_lessons([(task, mistake, solution)], memory_system=memory_system)
+
+    def learn_lessons(self, lessons: List[Tuple[str, str, str]], memory_system=None):
+        """
+        Records (task, mistake, solution) lessons with one playbook append and one vector insert,
+        however many lessons there are.
+        """
+        if not lessons: return
         try:
-            playbook = json.loads(self.file_path.read_text())
-            new_lesson = {
-                "timestamp": datetime.now().isoformat(),
-                "task": task,
-                "mistake": mistake,
-                "solution": solution
-            }
-            # Keep only the last 50 high-value lessons in the JSON backup
-            playbook = [new_lesson] + playbook[:49]
-            self.file_path.write_text(json.dumps(playbook, indent=2))
+            timestamp = datetime.now().isoformat()
+            new_lessons = [
+                {"timestamp": timestamp, "task": task, "mistake": mistake, "solution": solution}
+                for task, mistake, solution in lessons
+            ]
+            with self._lock:
+                with open(self.file_path, "ab") as f:
+                    f.write(b"".join(orjson.dumps(l) + b"\n" for l in new_lessons))
+                self._lessons.extendleft(new_lessons)
+                self._lines += len(new_lessons)
+                if self._lines > _COMPACT_AT:
+                    self._compact()
             
             # Index in Vector Memory for Semantic Retrieval
             if memory_system:
-                lesson_text = f"SITUATION: {task}\nMISTAKE: {mistake}\nSOLUTION: {solution}"
-                memory_system.add(lesson_text, {"type": "skill", "timestamp": new_lesson["timestamp"]})
+                memory_system.add_batch(
+                    [f"SITUATION: {l['task']}\nMISTAKE: {l['mistake']}\nSOLUTION: {l['solution']}" for l in new_lessons],
+                    [{"type": "skill", "timestamp": timestamp} for _ in new_lessons]
+                )
             
-            pretty_log("SKILL ACQUIRED", f"Lesson learned: {task[:30]}...", icon="🎓")
+            for l in new_lessons:
+                pretty_log("SKILL ACQUIRED", f"Lesson learned: {l['task'][:30]}...", icon="🎓")
         except Exception as e:
             logger.error(f"Failed to save skill: {e}")
 
@@ -51,11 +100,12 @@ class SkillMemory:
                     return context
 
             # Fallback to recent lessons if no vector search or no results
-            playbook = json.loads(self.file_path.read_text())
-            if not playbook: return "No lessons learned yet."
+            with self._lock:
+                recent = list(itertools.islice(self._lessons, 5)) # Only inject top 5 for efficiency
+            if not recent: return "No lessons learned yet."
             
             context = "## RECENT LESSONS LEARNED (Follow these to avoid repeats):\n"
-            for i, p in enumerate(playbook[:5]): # Only inject top 5 for efficiency
+            for i, p in enumerate(recent):
                 context += f"{i+1}. SITUATION: {p['task']}\n   PREVIOUS MISTAKE: {p['mistake']}\n   THE FIX: {p['solution']}\n"
             return context
         except: return ""
\ No newline at end of file
@@ -1,11 +1,15 @@
 import hashlib
-import json
 import logging
 import sys
 import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import List, Optional
 
+import orjson
+
 import chromadb
 from chromadb.config import Settings
 
@@ -16,6 +20,17 @@ from chromadb.api.types import EmbeddingFunction, Documents, Embeddings
 
 logger = logging.getLogger("GhostAgent")
 
+# Chunks per Chroma upsert during document ingest; each upsert embeds its whole batch in one pass
+_INGEST_BATCH = 256
+# Largest input list sent to the upstream /v1/embeddings endpoint in one request
+_EMBED_MAX_BATCH = 64
+
+# Queries that warrant an extra identity lookup, and the phrases that mark a memory about the user
+_IDENTITY_TRIGGERS = ("who", "my ", " i ", "profile", "preference", "remember")
+_NAME_MEMORY_RE = re.compile(r"name is|call me|user's|user is", re.IGNORECASE)
+# Throwaway queries run once at boot to page the HNSW index in and warm the embedding model
+_WARM_QUERIES = ["name", "user", "profile", "task", "tool"]
+
 class GhostEmbeddingFunction(EmbeddingFunction):
     """
     Custom robust embedding function that uses the upstream LLM.
@@ -30,14 +45,22 @@ class GhostEmbeddingFunction(EmbeddingFunction):
         if "127.0.0.1" not in upstream_url and "localhost" not in upstream_url and tor_proxy:
              proxy_url = tor_proxy.replace("socks5://", "socks5h://")
 
-        self.client = httpx.Client(timeout=60.0, proxy=proxy_url, http2=False)
+        # Large inputs are split into sequential requests; keep the connection warm between them
+        limits = httpx.Limits(max_keepalive_connections=4, keepalive_expiry=60.0)
+        self.client = httpx.Client(timeout=60.0, proxy=proxy_url, http2=False, limits=limits)
 
     def __call__(self, input: Documents) -> Embeddings:
         # ChromaDB expects a List of Embeddings
+        embeddings = []
+        for i in range(0, len(input), _EMBED_MAX_BATCH):
+            embeddings.extend(self._embed(input[i:i + _EMBED_MAX_BATCH]))
+        return embeddings
+
+    def _embed(self, batch: Documents) -> Embeddings:
         import time
         for attempt in range(3):
             try:
-                resp = self.client.post(self.url, json={"input": input, "model": "default"})
+                resp = self.client.post(self.url, json={"input": batch, "model": "default"})
                 resp.raise_for_status()
                 data = resp.json()
                 return [item["embedding"] for item in data["data"]]
@@ -58,8 +81,14 @@ class VectorMemory:
             self.chroma_dir.mkdir(parents=True, exist_ok=True)
 
         self.library_file = self.chroma_dir / "library_index.json"
+        # Ingested filenames in order, mirrored by a set for membership checks. Re-read only when the
+        # file's (mtime_ns, size) stamp changes; ingests run in worker threads, hence the lock
+        self._library: List[str] = []
+        self._library_set = set()
+        self._library_stamp = None
+        self._library_lock = threading.Lock()
         if not self.library_file.exists():
-            self.library_file.write_text("[]")
+            self._save_library([])
 
         # --- GRANITE4 STYLE: LOCAL EMBEDDINGS ---
         try:
@@ -106,6 +135,16 @@ class VectorMemory:
             logger.error(f"CRITICAL DB ERROR: {e}")
             self.collection = None
 
+    def warm_up(self):
+        """Runs a few throwaway queries so the first real search does not pay for a cold index and model."""
+        try:
+            count = self.collection.count() if self.collection else 0
+            if not count: return
+            self.collection.query(query_texts=_WARM_QUERIES, n_results=min(20, count))
+            pretty_log("Memory Warm", f"Index paged in ({count} items)", icon=Icons.MEM_READ)
+        except Exception as e:
+            logger.warning(f"Memory warm-up failed: {e}")
+
     def search_advanced(self, query: str, limit: int = 5):
         results = self.collection.query(
             query_texts=[query],
@@ -124,25 +163,48 @@ class VectorMemory:
         
         return parsed_results
 
+    def _library_state(self) -> List[str]:
+        try:
+            st = self.library_file.stat()
+        except FileNotFoundError:
+            return []
+        if (st.st_mtime_ns, st.st_size) != self._library_stamp:
+            try:
+                data = orjson.loads(self.library_file.read_bytes())
+            except orjson.JSONDecodeError:
+                data = []
+            self._library = data if isinstance(data, list) else []
+            self._library_set = set(self._library)
+            self._library_stamp = (st.st_mtime_ns, st.st_size)
+        return self._library
+
+    def _save_library(self, data: List[str]):
+        tmp = self.library_file.with_suffix(".json.tmp")
+        tmp.write_bytes(orjson.dumps(data))
+        os.replace(tmp, self.library_file)
+        st = self.library_file.stat()
+        self._library, self._library_set = data, set(data)
+        self._library_stamp = (st.st_mtime_ns, st.st_size)
+
     def _update_library_index(self, filename: str, action: str):
         try:
-            data = json.loads(self.library_file.read_text())
-            if action == "add" and filename not in data:
-                data.append(filename)
-            elif action == "remove" and filename in data:
-                data.remove(filename)
-            self.library_file.write_text(json.dumps(data))
+            with self._library_lock:
+                data = self._library_state()
+                if action == "add" and filename not in self._library_set:
+                    self._save_library(data + [filename])
+                elif action == "remove" and filename in self._library_set:
+                    self._save_library([f for f in data if f != filename])
         except Exception as e:
             logger.error(f"Library index error: {e}")
 
+    def reset_library(self):
+        with self._library_lock:
+            self._save_library([])
+
     def get_library(self):
-        if not self.library_file.exists():
-            return []
         try:
-            data = json.loads(self.library_file.read_text())
-            if isinstance(data, list):
-                return data
-            return []
+            with self._library_lock:
+                return list(self._library_state())
         except Exception:
             return []
     
@@ -158,6 +220,28 @@ class VectorMemory:
         self.collection.add(documents=[text], metadatas=[metadata], ids=[mem_id])
         pretty_log("Memory Save", text, icon=Icons.MEM_SAVE)
 
+    def add_batch(self, texts: List[str], metas: List[dict]):
+        """add() for many texts: one existence check and one insert (one embedding request) in total."""
+        pending = {}
+        for text, meta in zip(texts, metas):
+            if len(text) < 5: continue
+            pending.setdefault(hashlib.md5(text.encode("utf-8")).hexdigest(), (text, meta))
+        if not pending: return
+
+        existing = self.collection.get(ids=list(pending))
+        for mem_id in (existing or {}).get('ids') or []:
+            pending.pop(mem_id, None)
+        if not pending: return
+
+        ids = list(pending)
+        self.collection.add(
+            documents=[pending[i][0] for i in ids],
+            metadatas=[pending[i][1] or {"timestamp": get_utc_timestamp(), "type": "auto"} for i in ids],
+            ids=ids
+        )
+        for i in ids:
+            pretty_log("Memory Save", pending[i][0], icon=Icons.MEM_SAVE)
+
     def smart_update(self, text: str, type_label: str = "auto"):
         try:
             results = self.collection.query(query_texts=[text], n_results=1)
@@ -175,18 +259,31 @@ class VectorMemory:
 
     def ingest_document(self, filename: str, chunks: List[str]):
         try:
-            ids = [hashlib.md5(f"{filename}_{i}_{chunk[:20]}".encode()).hexdigest() for i, chunk in enumerate(chunks)]
-            metadatas = [{"timestamp": get_utc_timestamp(), "type": "document", "source": filename} for _ in range(len(chunks))]
-
-            batch_size = 20
-            for i in range(0, len(chunks), batch_size):
-                self.collection.upsert(
-                    documents=chunks[i:i + batch_size],
-                    metadatas=metadatas[i:i + batch_size],
-                    ids=ids[i:i + batch_size]
-                )
-                if i % 10 == 0:
-                    pretty_log("Memory Ingest", f"{filename} ({i+1}/{len(chunks)})", icon=Icons.MEM_INGEST)
+            # (filename, position) already identifies a chunk; BLAKE2b is cheaper than MD5 and the 16-byte digest
+            # keeps ids the same width
+            ids = [hashlib.blake2b(f"{filename}_{i}".encode(), digest_size=16).hexdigest() for i in range(len(chunks))]
+            timestamp = get_utc_timestamp()
+            metadatas = [{"timestamp": timestamp, "type": "document", "source": filename, "chunk_index": i} for i in range(len(chunks))]
+
+            # A re-ingest replaces the file wholesale: drop a longer previous version's tail and chunks stored
+            # under the old MD5 ids, which the upsert below would never overwrite
+            self.collection.delete(where={"source": filename})
+
+            # Pipelined: the next batch is embedded on a worker thread while the current one is written
+            # (SQLite + HNSW index), and upsert gets the vectors precomputed so it does not re-embed
+            with ThreadPoolExecutor(max_workers=1) as pool:
+                pending = pool.submit(self.embedding_fn, chunks[:_INGEST_BATCH]) if chunks else None
+                for i in range(0, len(chunks), _INGEST_BATCH):
+                    embeddings = pending.result()
+                    if i + _INGEST_BATCH < len(chunks):
+                        pending = pool.submit(self.embedding_fn, chunks[i + _INGEST_BATCH:i + 2 * _INGEST_BATCH])
+                    self.collection.upsert(
+                        documents=chunks[i:i + _INGEST_BATCH],
+                        embeddings=embeddings,
+                        metadatas=metadatas[i:i + _INGEST_BATCH],
+                        ids=ids[i:i + _INGEST_BATCH]
+                    )
+                    pretty_log("Memory Ingest", f"{filename} ({min(i + _INGEST_BATCH, len(chunks))}/{len(chunks)})", icon=Icons.MEM_INGEST)
 
             self._update_library_index(filename, "add")
             return True, f"Successfully ingested {len(chunks)} chunks from {filename}."
@@ -201,8 +298,8 @@ class VectorMemory:
                 # CONDITIONAL IDENTITY INJECTION
                 # Only inject identity context if the query actually asks for it.
                 # This prevents "pollution" where asking about Python code retrieves "My name is Bob".
-                identity_triggers = ["who", "my ", " i ", "profile", "preference", "remember"]
-                should_inject_identity = inject_identity and any(t in query.lower() for t in identity_triggers)
+                query_lower = query.lower()
+                should_inject_identity = inject_identity and any(t in query_lower for t in _IDENTITY_TRIGGERS)
                 
                 if should_inject_identity:
                     search_queries.insert(0, "User's profile. User's name. User preferences.")
@@ -227,46 +324,35 @@ class VectorMemory:
                         if doc in seen_docs: continue
 
                         m_type = meta.get('type', 'auto')
-                        doc_lower = doc.lower()
-                        timestamp = meta.get('timestamp', '0000-00-00')
-
                         is_summary = m_type == "document_summary"
-
-                        is_name_memory = (
-                            "name is" in doc_lower or
-                            "call me" in doc_lower or
-                            "user's" in doc_lower or
-                            "user is" in doc_lower
-                        )
-
-                        if is_name_memory:
-                            threshold = 1.0  # Tightened from 1.2
-                        elif is_summary:
-                            threshold = 0.75 # Tightened from 0.85
-                        elif is_identity_batch:
-                            threshold = 0.8 if m_type == 'manual' else 0.65
-                        else:
-                            # General technical memory needs strict relevance
-                            threshold = 0.65 if m_type == 'manual' else 0.55
-
-                        if dist < threshold or is_name_memory or is_summary:
-                            priority_score = 1
-
-                            if is_name_memory: priority_score = -20
-                            elif is_summary: priority_score = -15
-                            elif is_identity_batch: priority_score = -10
-                            elif m_type == 'manual': priority_score = 0
-                            elif m_type == 'document': priority_score = 2
-
-                            candidates.append({
-                                "doc": doc,
-                                "meta": meta,
-                                "dist": dist,
-                                "type": m_type,
-                                "p_score": priority_score,
-                                "timestamp": timestamp
-                            })
-                            seen_docs.add(doc)
+                        # One case-insensitive scan instead of lowercasing the whole chunk
+                        is_name_memory = _NAME_MEMORY_RE.search(doc) is not None
+
+                        # Name memories and summaries are always surfaced; everything else has to clear its bar
+                        if not (is_name_memory or is_summary):
+                            if is_identity_batch:
+                                threshold = 0.8 if m_type == 'manual' else 0.65
+                            else:
+                                # General technical memory needs strict relevance
+                                threshold = 0.65 if m_type == 'manual' else 0.55
+                            if dist >= threshold: continue
+
+                        priority_score = 1
+                        if is_name_memory: priority_score = -20
+                        elif is_summary: priority_score = -15
+                        elif is_identity_batch: priority_score = -10
+                        elif m_type == 'manual': priority_score = 0
+                        elif m_type == 'document': priority_score = 2
+
+                        candidates.append({
+                            "doc": doc,
+                            "meta": meta,
+                            "dist": dist,
+                            "type": m_type,
+                            "p_score": priority_score,
+                            "timestamp": meta.get('timestamp', '0000-00-00')
+                        })
+                        seen_docs.add(doc)
 
                 if should_inject_identity:
                     process_batch(0, is_identity_batch=True)
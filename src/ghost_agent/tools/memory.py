@@ -1,5 +1,4 @@
 import asyncio
-import hashlib
 import os
 from pathlib import Path
 from typing import List
@@ -136,26 +135,11 @@ async def tool_gain_knowledge(filename: str, sandbox_dir: Path, memory_system):
 
     pretty_log("KB Embed", f"{len(chunks)} fragments", icon=Icons.MEM_EMBED)
     try:
-        def batch_ingest(chunk_list, source_name):
-            # Reduced batch size for smoother upstream LLM processing
-            batch_size = 25 
-            for i in range(0, len(chunk_list), batch_size):
-                batch = chunk_list[i : i + batch_size]
-                ids = [hashlib.md5(f"{source_name}_{i+j}_{chunk[:20]}".encode()).hexdigest() for j, chunk in enumerate(batch)]
-                metadatas = [{"source": source_name, "type": "document", "chunk_index": i+j, "timestamp": get_utc_timestamp()} for j in range(len(batch))]
-                memory_system.collection.upsert(documents=batch, metadatas=metadatas, ids=ids)
-                
-                # Progress logging every 2 batches
-                if i % 50 == 0:
-                    pretty_log("KB Progress", f"{min(i+batch_size, len(chunk_list))}/{len(chunk_list)}", icon=Icons.MEM_EMBED)
-        
-        await asyncio.to_thread(batch_ingest, chunks, filename)
-        preview = full_text[:300].replace("\n", " ") + "..."
+        # One upsert per large batch (see VectorMemory.ingest_document); also records the file in the library
+        ok, msg = await asyncio.to_thread(memory_system.ingest_document, filename, chunks)
+        if not ok: return f"Embedding Error: {msg}"
     except Exception as e: return f"Embedding Error: {e}"
 
-    try: await asyncio.to_thread(memory_system._update_library_index, filename, "add")
-    except: pass 
-
     return f"SUCCESS: Ingested '{filename}'."
 
 async def tool_recall(query: str, memory_system):
@@ -325,7 +309,7 @@ async def tool_knowledge_base(action: str, sandbox_dir: Path, memory_system, **k
 
             for i in range(0, len(all_ids), 500): memory_system.collection.delete(ids=all_ids[i:i+500])
 
-        memory_system.library_file.write_text("[]")
+        memory_system.reset_library()
 
         return "Success: Wiped clean."
 
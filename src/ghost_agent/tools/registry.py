@@ -1,4 +1,5 @@
 from typing import Dict, Any, List, Callable
+import orjson
 from .search import tool_search, tool_deep_research, tool_fact_check
 from .database import tool_postgres_admin
 from .file_system import tool_file_system
@@ -53,6 +54,24 @@ TOOL_DEFINITIONS = [
     }
 ]
 
+# Encoded once at import; LLMClient splices it into each request body
+TOOL_DEFINITIONS_JSON = orjson.dumps(TOOL_DEFINITIONS)
+
+# Mandatory triggers for the system prompt's TOOL ORCHESTRATION section: (label, tools named, instruction).
+# A line is only rendered while every tool it names is defined above, so the prompt cannot drift from the toolset.
+TOOL_TRIGGERS = [
+    ("SLEEP/REST", ("dream_mode",), "If the user asks you to sleep, rest, or extract heuristics, YOU MUST ONLY call `dream_mode`."),
+    ("FACTS", ("fact_check", "deep_research"), "If a verifiable claim is made, use `fact_check` or `deep_research`."),
+    ("EXECUTION", ("execute",), "Use `execute` for running ALL code (.py, .sh)."),
+    ("MEMORY", ("update_profile",), "Use `update_profile` to remember user facts permanently."),
+    ("AUTOMATION", ("manage_tasks",), "Use `manage_tasks` to schedule background jobs."),
+    ("HEALTH/DIAGNOSTICS", ("system_utility",), 'Use `system_utility(action="check_health")` to check system status.'),
+]
+
+def tool_trigger_map() -> str:
+    names = {t["function"]["name"] for t in TOOL_DEFINITIONS}
+    return "\n".join(f"- {label}: {text}" for label, tools, text in TOOL_TRIGGERS if all(t in names for t in tools))
+
 def get_available_tools(context):
     from .memory import tool_dream_mode # Lazy import to avoid circular dependencies
     return {
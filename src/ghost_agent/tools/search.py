@@ -1,7 +1,7 @@
 import asyncio
 import importlib.util
-import json
 import os
+import orjson
 from typing import List, Dict, Any, Callable
 from ..utils.logging import Icons, pretty_log
 from ..utils.helpers import helper_fetch_url_content
@@ -119,7 +119,7 @@ async def tool_fact_check(statement: str, http_client, tool_definitions, deep_re
 
         call = tool_calls[0]
         func_name = call["function"]["name"]
-        func_args = json.loads(call["function"]["arguments"])
+        func_args = orjson.loads(call["function"]["arguments"])
         
         if func_name == "deep_research":
             research_result = await deep_research_callable(**func_args)
@@ -4,6 +4,16 @@ import io
 import ast
 from typing import Optional, Tuple, List
 
+# Compiled once; the line repairs run over every line of every script that fails to parse
+_CODE_BLOCK_RE = re.compile(r'```[ \t]*(?:[a-zA-Z]+)?(?:[ \t]*\n|[ \t]+)(.*?)```', re.DOTALL)
+_TRAILING_BACKSLASH_RE = re.compile(r'(\\+)\s*$')
+_ESCAPED_QUOTE_EOL_RE = re.compile(r'(?<!\\)\\([\'"])\s*$')
+_ESCAPED_QUOTE_PAREN_EOL_RE = re.compile(r'(?<!\\)\\([\'"]?)\s*\)\s*$')
+_ESCAPED_QUOTE_OPEN_RE = re.compile(r'([fbr\(,{])\\([\'"])')
+_ESCAPED_QUOTE_CLOSE_RE = re.compile(r'(?<!\\)\\([\'"])([\),])')
+_STUTTER_RE = re.compile(r'(\?[\w,]{1,3}){3,}')
+_TRAILING_QMARKS_RE = re.compile(r'(\?){3,}$')
+
 def extract_code_from_markdown(text: str) -> str:
     """
     Extracts code from markdown blocks if present.
@@ -12,8 +22,7 @@ def extract_code_from_markdown(text: str) -> str:
     # Matches: ```python code... ``` or ```python\ncode...```
     # Relaxed pattern: Matches ``` then optional language, then any newline/space, then code, then ```
     # handle optional spaces before language, and lenient newline check
-    code_block_pattern = re.compile(r'```[ \t]*(?:[a-zA-Z]+)?(?:[ \t]*\n|[ \t]+)(.*?)```', re.DOTALL)
-    match = code_block_pattern.search(text)
+    match = _CODE_BLOCK_RE.search(text)
     if match:
         return match.group(1).strip()
     
@@ -33,7 +42,7 @@ def _repair_line(line: str) -> str:
     Applies aggressive regex fixes to a single line based on common hallucinations.
     """
     # 0. Strip unexpected trailing backslash (causes: SyntaxError: unexpected character after line continuation)
-    match = re.search(r'(\\+)\s*$', line)
+    match = _TRAILING_BACKSLASH_RE.search(line)
     if match:
         num_slashes = len(match.group(1))
         if num_slashes % 2 != 0:
@@ -44,14 +53,14 @@ def _repair_line(line: str) -> str:
     # Fix: Trailing backslash or escaped quote at EOL (keep quote if it was escaped)
     # Hallucination: print("...\" ) -> print("...")
     # NOTE: We use negative lookbehind (?<!\\) to ensure we don't match \\" which is valid escaped backslash + quote
-    line = re.sub(r'(?<!\\)\\([\'"])\s*$', r'\1', line).rstrip()
-    line = re.sub(r'(?<!\\)\\([\'"]?)\s*\)\s*$', r'\1)', line)
+    line = _ESCAPED_QUOTE_EOL_RE.sub(r'\1', line).rstrip()
+    line = _ESCAPED_QUOTE_PAREN_EOL_RE.sub(r'\1)', line)
      
     # Fix: hallucinated escape sequences in f-strings or prints
     # f\" -> f" , print(\" -> print("
-    line = re.sub(r'([fbr\(,{])\\([\'"])', r'\1\2', line)
+    line = _ESCAPED_QUOTE_OPEN_RE.sub(r'\1\2', line)
     # \") -> ")
-    line = re.sub(r'(?<!\\)\\([\'"])([\),])', r'\1\2', line)
+    line = _ESCAPED_QUOTE_CLOSE_RE.sub(r'\1\2', line)
     
     # Fix: Trailing backticks at EOL (common hallucination: print("hi")`)
     line = line.rstrip('`')
@@ -87,8 +96,8 @@ def fix_python_syntax(code: str) -> str:
     Attempts to fix common Python syntax errors using a combination of regex and tokenization checks.
     """
     # 0. Brute-force cleanup
-    code = re.sub(r'(\?[\w,]{1,3}){3,}', '', code) # Stuttering
-    code = re.sub(r'(\?){3,}$', '', code) # Trailing ? sequence (stuttering)
+    code = _STUTTER_RE.sub('', code) # Stuttering
+    code = _TRAILING_QMARKS_RE.sub('', code) # Trailing ? sequence (stuttering)
     code = code.rstrip('`') # Trailing backticks at end of file
     
     # --- MASHED NEWLINE HEURISTIC ---
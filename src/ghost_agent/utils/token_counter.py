@@ -1,5 +1,7 @@
 import os
+from collections import OrderedDict
 from pathlib import Path
+from typing import Dict, Optional, Tuple
 from transformers import AutoTokenizer
 
 GRANITE_MODEL_ID = "Qwen/Qwen2.5-Coder-7B-Instruct"
@@ -10,6 +12,7 @@ def load_tokenizer(local_tokenizer_path: Path):
     Robust loading strategy: LOCAL DISK -> TOR NETWORK -> FALLBACK
     """
     global TOKEN_ENCODER
+    clear_token_cache()
     # 1. Try Local Disk (Offline Mode) - PREFERRED
     if local_tokenizer_path.exists() and (local_tokenizer_path / "tokenizer.json").exists():
         try:
@@ -64,3 +67,53 @@ def estimate_tokens(text: str) -> int:
     # CASE 2: Fallback (No tokenizer loaded)
     # Granite models generally average ~3-4 characters per token
     return len(text) // 3
+
+# Token counts keyed by (hash, length) of the text, so the cache never pins message bodies in memory
+_TOKEN_CACHE: "OrderedDict[Tuple[int, int], int]" = OrderedDict()
+_TOKEN_CACHE_MAX = 4096
+_TOKEN_CACHE_STATS = {"hits": 0, "misses": 0}
+
+def estimate_tokens_cached(text: str) -> int:
+    """
+    Memoized estimate_tokens.
+    The reasoning loop re-counts the same message contents every turn; a mutated message
+    simply misses the cache. Cleared whenever a tokenizer is (re)loaded.
+    """
+    key = (hash(text), len(text))
+    count = _TOKEN_CACHE.get(key)
+    if count is not None:
+        _TOKEN_CACHE.move_to_end(key)
+        _TOKEN_CACHE_STATS["hits"] += 1
+        return count
+    _TOKEN_CACHE_STATS["misses"] += 1
+    for prefix in _STATIC_PREFIXES:
+        if text.startswith(prefix):
+            count = register_static_prefix(prefix) + estimate_tokens(text[len(prefix):])
+            break
+    else:
+        count = estimate_tokens(text)
+    _TOKEN_CACHE[key] = count
+    if len(_TOKEN_CACHE) > _TOKEN_CACHE_MAX:
+        _TOKEN_CACHE.popitem(last=False)
+    return count
+
+# Static prompt prefixes -> their token count under the current tokenizer (None until first counted)
+_STATIC_PREFIXES: Dict[str, Optional[int]] = {}
+
+def register_static_prefix(prefix: str) -> int:
+    """
+    Pre-tokenizes a prompt prefix shared by many texts (e.g. a system prompt's static rules).
+    A text that starts with it only has its remainder tokenized; the count may differ from a
+    whole-text encode by a token where merges span the boundary, which is fine for budgeting.
+    """
+    count = _STATIC_PREFIXES.get(prefix)
+    if count is None:
+        count = _STATIC_PREFIXES[prefix] = estimate_tokens(prefix)
+    return count
+
+def clear_token_cache():
+    _TOKEN_CACHE.clear()
+    _TOKEN_CACHE_STATS.update(hits=0, misses=0)
+    # Prefixes stay registered; they are re-counted with the next tokenizer on first use
+    for prefix in _STATIC_PREFIXES:
+        _STATIC_PREFIXES[prefix] = None
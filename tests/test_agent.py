@@ -53,3 +53,137 @@ def test_process_rolling_window_deduplication(mock_agent):
     assist_msgs = [m for m in clean if m["role"] == "assistant"]
     assert len(assist_msgs) == 1
     assert assist_msgs[0]["content"] == "Real response"
+
+def test_process_rolling_window_fast_path_under_budget(mock_agent):
+    messages = [
+        {"role": "system", "content": "System"},
+        {"role": "user", "content": "Hi"},
+        {"role": "tool", "name": "exec", "content": "Result A"},
+        {"role": "system", "content": "Late system note"},
+        {"role": "assistant", "content": "Real response"}
+    ]
+
+    clean = mock_agent.process_rolling_window(messages, max_tokens=1000)
+
+    # Nothing is dropped; system messages are hoisted exactly like the full pass does
+    assert [m["content"] for m in clean] == ["System", "Late system note", "Hi", "Result A", "Real response"]
+    assert all(a is b for a, b in zip(clean[2:], [messages[1], messages[2], messages[4]]))
+
+def test_process_rolling_window_skips_tokenizer_well_under_budget(mock_agent):
+    from unittest.mock import patch
+    messages = [{"role": "user", "content": "Hi"}, {"role": "assistant", "content": "Hello"}]
+    with patch("ghost_agent.core.agent.estimate_tokens_cached") as est:
+        clean = mock_agent.process_rolling_window(messages, max_tokens=1000)
+    assert clean == messages
+    est.assert_not_called()
+
+def test_process_rolling_window_fast_path_bounds_multibyte_content(mock_agent):
+    from unittest.mock import patch
+    # CJK tokenizes at about one token per character, far denser than 4 chars/token
+    messages = [{"role": "user" if i % 2 == 0 else "assistant", "content": "漢" * 1000} for i in range(9)]
+    with patch("ghost_agent.core.agent.estimate_tokens_cached", side_effect=len):
+        clean = mock_agent.process_rolling_window(messages, max_tokens=4000)
+        assert sum(len(m["content"]) for m in clean) <= 4000
+    assert clean[-1] is messages[-1]
+
+def test_process_rolling_window_degrades_old_turns_only_when_over_budget(mock_agent):
+    from ghost_agent.utils.token_counter import estimate_tokens_cached
+    messages = [{"role": "system", "content": "System"}, {"role": "tool", "name": "read", "content": "B" * 6000}]
+    messages += [{"role": "user", "content": f"turn {i}"} for i in range(5)]
+
+    roomy = mock_agent.process_rolling_window(messages, max_tokens=100000)
+    assert roomy[1]["content"] == "B" * 6000
+
+    # Room for everything but the raw 6000 chars: the old output is compressed, not dropped
+    tail = sum(estimate_tokens_cached(m["content"]) for m in messages if m["role"] != "tool")
+    clean = mock_agent.process_rolling_window(messages, max_tokens=tail + estimate_tokens_cached("B" * 6000) - 1)
+    assert "[OLD DATA COMPRESSED]" in clean[1]["content"]
+    assert messages[1]["content"] == "B" * 6000  # the caller's message is left untouched
+    assert [m["content"] for m in clean[2:]] == [f"turn {i}" for i in range(5)]
+
+    # A tight budget keeps only the newest messages, still in chronological order
+    tight = mock_agent.process_rolling_window(messages, max_tokens=8)
+    assert tight[0]["role"] == "system"
+    assert [m["content"] for m in tight[1:]] == [f"turn {i}" for i in range(2, 5)]
+
+def test_process_rolling_window_keeps_tool_results_with_their_call(mock_agent):
+    call = lambda i: {"role": "assistant", "content": "", "tool_calls": [{"id": f"c{i}", "type": "function", "function": {"name": "read", "arguments": "{}"}}]}
+    messages = [{"role": "user", "content": "original task"}]
+    for i in range(8):
+        messages += [call(i), {"role": "tool", "tool_call_id": f"c{i}", "name": "read", "content": f"{i}" * 3000}]
+    messages.append({"role": "user", "content": "latest"})
+
+    clean = mock_agent.process_rolling_window(messages, max_tokens=4600)
+
+    # The opening turn survives, and every kept tool result still follows its call
+    assert clean[0]["content"] == "original task"
+    assert clean[-1]["content"] == "latest"
+    for idx, m in enumerate(clean):
+        if m["role"] == "tool":
+            prev = clean[idx - 1]
+            assert prev["role"] == "assistant" and prev["tool_calls"][0]["id"] == m["tool_call_id"]
+    # Older turns degraded instead of crowding out the opening one
+    assert any("[OLD DATA TRUNCATED]" in m["content"] for m in clean if m["role"] == "tool")
+
+@pytest.mark.asyncio
+async def test_sandbox_state_reused_until_directory_changes(mock_agent, tmp_path):
+    mock_agent.context.sandbox_dir = tmp_path
+    mock_agent.context.memory_system = None
+    mock_agent.context.cached_sandbox_state = None
+    (tmp_path / "a.py").write_text("print(1)")
+
+    first = await mock_agent._get_sandbox_state()
+    assert "a.py" in first
+    assert await mock_agent._get_sandbox_state() is first
+
+    import os
+    (tmp_path / "b.py").write_text("print(2)")
+    stat = os.stat(tmp_path)
+    os.utime(tmp_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert "b.py" in await mock_agent._get_sandbox_state()
+
+def test_coerce_tool_result_keeps_head_and_tail():
+    from ghost_agent.core.agent import _coerce_tool_result, _TRUNC_MARKER
+    full, safe = _coerce_tool_result("short\r\n")
+    assert safe == "short\n"
+
+    noisy = "\r" * 50_000
+    full, safe = _coerce_tool_result(noisy)
+    assert full is noisy  # untruncated text is never rewritten
+    assert safe == _TRUNC_MARKER
+
+    big = "H" * 2000 + "M" * 100_000 + "T" * 2000
+    full, safe = _coerce_tool_result(big)
+    assert full == big
+    assert safe == "H" * 2000 + _TRUNC_MARKER + "T" * 2000
+
+def test_content_str_handles_non_string_content():
+    from ghost_agent.core.agent import _content_str
+    assert _content_str({"content": "text"}) == "text"
+    assert _content_str({"role": "assistant", "content": None}) == ""
+    assert _content_str({"role": "assistant"}) == ""
+    assert _content_str({"content": [{"type": "text", "text": "hi"}]}) == "[{'type': 'text', 'text': 'hi'}]"
+
+def test_scrub_only_copies_when_needed():
+    from ghost_agent.core.agent import _scrub
+    clean = "no carriage returns here\n"
+    assert _scrub(clean) is clean
+    assert _scrub("a\r\nb\x00") == "a\nb"
+
+def test_release_unused_ram_collects_young_generations_unless_full():
+    from unittest.mock import patch
+    agent = GhostAgent(MagicMock())
+    with patch("ghost_agent.core.agent.gc.collect") as collect:
+        agent.release_unused_ram()
+        collect.assert_called_once_with(1)
+    with patch("ghost_agent.core.agent.gc.collect") as collect:
+        agent.clear_session()
+        collect.assert_called_once_with()
+
+def test_trivial_greetings_match_whole_words_only():
+    from ghost_agent.core.agent import _TRIVIAL_RE
+    assert _TRIVIAL_RE.search("hi")
+    assert _TRIVIAL_RE.search("hi, how are you?")
+    assert _TRIVIAL_RE.search("whats up")
+    assert not _TRIVIAL_RE.search("this is a shell script")
+    assert not _TRIVIAL_RE.search("read othello.txt")
@@ -54,6 +54,9 @@ async def test_critic_check_strips_markdown():
     # CRITICAL: The markdown backticks and 'python' tag should be gone
     assert "```" not in revised_code
     assert revised_code == "print('Clean code')"
+    # Decoding is constrained to the verdict schema
+    from ghost_agent.core.schemas import CRITIC_VERDICT_FORMAT
+    assert ctx.llm_client.chat_completion.call_args[0][0]["response_format"] == CRITIC_VERDICT_FORMAT
 
 @pytest.mark.asyncio
 async def test_critic_check_fail_open_on_error():
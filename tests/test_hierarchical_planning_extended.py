@@ -49,3 +49,133 @@ def test_get_next_step():
     # Logic usually picks first READY or PENDING
     next_node = tree.get_active_node()
     assert next_node.id == c2
+
+def test_deep_chain_traversal_is_not_recursive():
+    tree = TaskTree()
+    parent = tree.add_task("Root")
+    chain = [parent]
+    for i in range(3000):
+        tree._attach(TaskNode(id=f"n{i}", description=f"Step {i}", parent_id=parent))
+        parent = f"n{i}"
+        chain.append(parent)
+
+    assert tree.get_active_node().id == chain[-1]
+    tree.update_status(chain[-1], TaskStatus.DONE)
+    assert all(tree.nodes[n].status == TaskStatus.DONE for n in chain)
+    # Rendering still stops at the depth cap, in pre-order
+    lines = tree.render().splitlines()
+    assert len(lines) == 21
+    assert lines[1].startswith("  ") and "Step 0" in lines[1]
+
+def test_parent_completion_tracks_reopened_children():
+    tree = TaskTree()
+    root = tree.add_task("Root")
+    c1 = tree.add_task("C1", parent_id=root)
+    c2 = tree.add_task("C2", parent_id=root, status=TaskStatus.DONE)
+    assert tree.nodes[root].pending_children == 1
+
+    # Re-marking a finished child, or reopening it, keeps the count honest
+    tree.update_status(c2, TaskStatus.DONE)
+    tree.update_status(c2, TaskStatus.FAILED)
+    tree.update_status(c1, TaskStatus.DONE)
+    assert tree.nodes[root].status != TaskStatus.DONE
+
+    tree.update_status(c2, TaskStatus.DONE)
+    assert tree.nodes[root].status == TaskStatus.DONE
+    assert tree.nodes[root].pending_children == 0
+
+def test_loaded_tree_counts_pending_children():
+    tree = TaskTree()
+    tree.load_from_json({"id": "r", "description": "Root", "children": [
+        {"id": "a", "description": "A", "status": "DONE"},
+        {"id": "b", "description": "B", "children": [{"id": "b1", "description": "B1"}]},
+    ]})
+    assert tree.nodes["r"].pending_children == 1
+    tree.update_status("b1", TaskStatus.DONE)
+    assert tree.nodes["b"].status == TaskStatus.DONE
+    assert tree.nodes["r"].status == TaskStatus.DONE
+
+def test_generated_ids_are_short_and_unique():
+    tree = TaskTree()
+    root = tree.add_task("Root")
+    ids = [root] + [tree.add_task(f"T{i}", parent_id=root) for i in range(2000)]
+    assert len(set(ids)) == len(ids) == len(tree.nodes)
+    assert all(len(i) == 4 for i in ids)
+
+def test_render_and_json_cached_until_mutation():
+    tree = TaskTree()
+    root = tree.add_task("Root")
+    child = tree.add_task("Child", parent_id=root)
+
+    first = tree.render()
+    assert tree.render() is first
+    plan = tree.to_json()
+    assert tree.to_json() is plan
+
+    tree.update_status(child, TaskStatus.DONE)
+    assert "(DONE)" in tree.render() and tree.render() is not first
+    assert tree.to_json()["children"][0]["status"] == "DONE"
+
+    tree.add_task("Later", parent_id=root)
+    assert "Later" in tree.render()
+    tree.load_from_json({"id": "x", "description": "Fresh"})
+    assert "Fresh" in tree.render() and "Root" not in tree.render()
+
+def test_deep_plan_round_trips_without_recursion():
+    import orjson
+    tree = TaskTree()
+    parent = tree.add_task("Level 0")
+    for i in range(1, 3000):
+        parent = tree.add_task(f"Level {i}", parent_id=parent)
+    tree.add_task("Sibling", parent_id=tree.root_id)
+
+    data = tree.to_json()
+    assert [c["description"] for c in data["children"]] == ["Level 1", "Sibling"]
+
+    clone = TaskTree()
+    clone.load_from_json(data)
+    assert len(clone.nodes) == 3001
+    # (Nested dict equality would itself recurse, so compare the flat node links)
+    assert {n.id: (n.parent_id, n.children) for n in clone.nodes.values()} == \
+        {n.id: (n.parent_id, n.children) for n in tree.nodes.values()}
+
+    shallow = TaskTree()
+    shallow.load_from_json({"id": "r", "description": "Root", "children": [{"id": "a", "description": "A", "status": "done"}]})
+    assert orjson.loads(shallow.to_json_bytes()) == shallow.to_json()
+
+def test_node_to_dict_is_plain_and_detached():
+    from dataclasses import fields
+    tree = TaskTree()
+    root = tree.add_task("Root")
+    tree.add_task("Child", parent_id=root)
+    d = tree.nodes[root].to_dict()
+
+    assert set(d) == {f.name for f in fields(TaskNode)}
+    assert type(d["status"]) is str and d["status"] == "PENDING"
+    assert d["pending_children"] == 1
+    d["children"].append("zzzz")
+    assert tree.nodes[root].children != d["children"]
+
+def test_task_node_has_no_instance_dict():
+    node = TaskNode(id="a", description="A")
+    assert not hasattr(node, "__dict__")
+    with pytest.raises(AttributeError):
+        node.extra = 1
+
+def test_active_node_prefers_failed_then_in_progress_then_first_ready():
+    tree = TaskTree()
+    root = tree.add_task("Root")
+    a = tree.add_task("A", parent_id=root, status=TaskStatus.PENDING)
+    b = tree.add_task("B", parent_id=root, status=TaskStatus.READY)
+    c = tree.add_task("C", parent_id=root, status=TaskStatus.IN_PROGRESS)
+    d = tree.add_task("D", parent_id=root, status=TaskStatus.FAILED)
+
+    assert tree.get_active_node().id == d
+    tree.update_status(d, TaskStatus.DONE)
+    assert tree.get_active_node().id == c
+    tree.update_status(c, TaskStatus.BLOCKED)
+    assert tree.get_active_node().id == a
+    tree.update_status(a, TaskStatus.DONE)
+    assert tree.get_active_node().id == b
+    tree.update_status(b, TaskStatus.DONE)
+    assert tree.get_active_node() is None
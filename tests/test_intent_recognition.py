@@ -80,3 +80,12 @@ async def test_intent_dba_routing(mock_pretty_log, mock_agent):
     logs2 = [call.args for call in mock_pretty_log.call_args_list]
     dba_logs2 = [l for l in logs2 if len(l) > 1 and "Ghost PostgreSQL DBA Activated" in str(l[1])]
     assert len(dba_logs2) > 0
+
+def test_intent_vocabularies_keep_word_boundaries():
+    """The set-based keyword lookup must keep the old \\b semantics."""
+    from ghost_agent.core.agent import _WORD_RE, _DBA_KEYWORDS, _CODING_KEYWORDS
+
+    assert "sh" not in set(_WORD_RE.findall("a short bash-free note"))
+    assert not set(_WORD_RE.findall("select * from pg_stat_activity")) & _DBA_KEYWORDS
+    assert set(_WORD_RE.findall("what's the sql?")) & _DBA_KEYWORDS == {"sql"}
+    assert set(_WORD_RE.findall("run it with sh-script")) & _CODING_KEYWORDS == {"sh", "script"}
@@ -0,0 +1,38 @@
+import pytest
+from unittest.mock import MagicMock, AsyncMock
+from ghost_agent.core.agent import GhostAgent
+from ghost_agent.core.llm_cache import LLMCache
+
+def test_cache_key_only_for_deterministic_payloads():
+    cache = LLMCache()
+    payload = {"model": "m", "messages": [{"role": "user", "content": "x"}], "temperature": 0.0}
+    assert cache.make_key(payload) is not None
+    assert cache.make_key({**payload, "temperature": 0.1}) is None
+    assert cache.make_key({k: v for k, v in payload.items() if k != "temperature"}) is None
+
+def test_cache_lru_eviction_and_ttl():
+    cache = LLMCache(max_entries=2, ttl=3600)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+
+    expired = LLMCache(ttl=-1)
+    expired.set("a", 1)
+    assert expired.get("a") is None
+
+@pytest.mark.asyncio
+async def test_critic_check_reuses_cached_verdict():
+    context = MagicMock()
+    context.llm_client.chat_completion = AsyncMock(return_value={
+        "choices": [{"message": {"content": '{"status": "APPROVED"}'}}]
+    })
+    agent = GhostAgent(context)
+
+    first = await agent._run_critic_check("print('hi')", "Say hi", "test-model")
+    second = await agent._run_critic_check("print('hi')", "Say hi", "test-model")
+
+    assert first == second == (True, None, "Approved")
+    assert context.llm_client.chat_completion.await_count == 1
@@ -0,0 +1,96 @@
+import pytest
+import httpx
+import orjson
+from ghost_agent.core.llm import LLMClient
+
+@pytest.mark.asyncio
+async def test_chat_completion_splices_pre_serialized_tools():
+    from ghost_agent.tools.registry import TOOL_DEFINITIONS, TOOL_DEFINITIONS_JSON
+    seen_bodies = []
+
+    def handler(request):
+        seen_bodies.append(orjson.loads(request.content))
+        return httpx.Response(200, json={"choices": [{"message": {"content": "ok"}}]})
+
+    client = LLMClient(upstream_url="http://127.0.0.1:8080")
+    client.http_client = httpx.AsyncClient(base_url="http://127.0.0.1:8080", transport=httpx.MockTransport(handler))
+
+    payload = {"model": "m", "messages": [{"role": "user", "content": "hi"}], "tools": TOOL_DEFINITIONS}
+    await client.chat_completion(payload, tools_blob=TOOL_DEFINITIONS_JSON)
+    await client.chat_completion(payload)
+    await client.close()
+
+    assert seen_bodies[0] == seen_bodies[1] == payload
+
+@pytest.mark.asyncio
+async def test_stream_openai_emits_valid_sse_chunks():
+    client = LLMClient(upstream_url="http://127.0.0.1:8080")
+    chunks = [c async for c in client.stream_openai("m", "héllo", 1, "abc")]
+    await client.close()
+
+    assert chunks[-1] == b"data: [DONE]\n\n"
+    events = [orjson.loads(c[len(b"data: "):]) for c in chunks[:-1]]
+    assert [e["id"] for e in events] == ["chatcmpl-abc"] * 3
+    assert events[1]["choices"][0]["delta"]["content"] == "héllo"
+    assert events[2]["choices"][0]["finish_reason"] == "stop"
+    assert events[0] == {
+        "id": "chatcmpl-abc", "object": "chat.completion.chunk", "created": 1, "model": "m",
+        "choices": [{"index": 0, "delta": {"role": "assistant"}, "finish_reason": None}],
+    }
+    assert events[2]["choices"][0]["delta"] == {}
+
+@pytest.mark.asyncio
+async def test_stream_openai_escapes_model_and_request_id():
+    client = LLMClient(upstream_url="http://127.0.0.1:8080")
+    chunks = [c async for c in client.stream_openai('m"x\\', "hi", 7, 'r"1')]
+    await client.close()
+    for c in chunks[:-1]:
+        event = orjson.loads(c[len(b"data: "):])
+        assert event["model"] == 'm"x\\' and event["id"] == 'chatcmpl-r"1' and event["created"] == 7
+
+def test_llm_client_is_defined_once_with_full_api():
+    import ast, inspect
+    import ghost_agent.core.llm as llm_mod
+    tree = ast.parse(inspect.getsource(llm_mod))
+    assert [n.name for n in tree.body if isinstance(n, ast.ClassDef)].count("LLMClient") == 1
+    for name in ("chat_completion", "get_embeddings", "stream_openai", "close"):
+        assert callable(getattr(LLMClient, name))
+
+def test_llm_client_pool_limits_and_optional_http2():
+    import importlib.util
+    client = LLMClient(upstream_url="http://127.0.0.1:8080")
+    pool = client.http_client._transport._pool
+    assert pool._max_connections == 200
+    assert pool._max_keepalive_connections == 100
+    assert pool._http2 is (importlib.util.find_spec("h2") is not None)
+
+@pytest.mark.asyncio
+async def test_post_with_retry_waits_out_busy_upstream_but_not_client_errors(monkeypatch):
+    import ghost_agent.core.llm as llm_mod
+    sleeps = []
+
+    async def fake_sleep(seconds):
+        sleeps.append(seconds)
+
+    monkeypatch.setattr(llm_mod.asyncio, "sleep", fake_sleep)
+    statuses = [503, 429, 200]
+
+    def handler(request):
+        status = statuses.pop(0)
+        if status == 200:
+            return httpx.Response(200, json={"data": [{"embedding": [0.1, 0.2]}]})
+        return httpx.Response(status, content=b"busy")
+
+    client = LLMClient(upstream_url="http://127.0.0.1:8080")
+    client.http_client = httpx.AsyncClient(base_url="http://127.0.0.1:8080", transport=httpx.MockTransport(handler))
+    assert await client.get_embeddings(["x"]) == [[0.1, 0.2]]
+    assert sleeps == [2, 4]
+
+    client.http_client = httpx.AsyncClient(
+        base_url="http://127.0.0.1:8080",
+        transport=httpx.MockTransport(lambda request: httpx.Response(400, content=b"bad request")),
+    )
+    with pytest.raises(httpx.HTTPStatusError):
+        await client.chat_completion({"model": "m", "messages": []})
+    assert sleeps == [2, 4]
+    await client.close()
@@ -67,3 +67,86 @@ def test_smart_update_replacement(memory_system):
     print(f"DEBUG RESULTS: {query}")
     # We assert that we at least have the latest info
     assert "actually blue" in query
+
+def test_add_batch_skips_existing_and_short_entries(memory_system):
+    memory_system.add("Docker volumes need absolute paths.", {"type": "skill"})
+    memory_system.add_batch(
+        ["Docker volumes need absolute paths.", "Pin numpy below 2 for torch 1.x.", "tiny"],
+        [{"type": "skill"}, {"type": "skill"}, {"type": "skill"}],
+    )
+    assert memory_system.collection.count() == 2
+
+def test_library_index_is_cached_and_tracks_external_resets(memory_system, monkeypatch):
+    import orjson
+    memory_system._update_library_index("a.pdf", "add")
+    memory_system._update_library_index("b.pdf", "add")
+    memory_system._update_library_index("a.pdf", "add")
+    assert orjson.loads(memory_system.library_file.read_bytes()) == ["a.pdf", "b.pdf"]
+
+    reads = []
+    real_read = type(memory_system.library_file).read_bytes
+    monkeypatch.setattr(type(memory_system.library_file), "read_bytes", lambda self: reads.append(self) or real_read(self))
+    assert memory_system.get_library() == ["a.pdf", "b.pdf"]
+    memory_system._update_library_index("a.pdf", "remove")
+    assert memory_system.get_library() == ["b.pdf"] and reads == []
+
+    memory_system.reset_library()
+    assert memory_system.get_library() == []
+    memory_system.library_file.write_bytes(b'["c.pdf", "d.pdf"]')
+    assert memory_system.get_library() == ["c.pdf", "d.pdf"]
+
+def test_ingest_document_upserts_in_large_batches(memory_system):
+    from unittest.mock import patch
+    chunks = [f"Chunk number {i} of the manual." for i in range(300)]
+    with patch.object(memory_system.collection, "upsert", wraps=memory_system.collection.upsert) as upsert:
+        ok, _ = memory_system.ingest_document("manual.txt", chunks)
+    assert ok
+    assert [len(c.kwargs["documents"]) for c in upsert.call_args_list] == [256, 44]
+    assert memory_system.collection.count() == 300
+    assert memory_system.get_library() == ["manual.txt"]
+    meta = memory_system.collection.get(where={"chunk_index": 299})["metadatas"][0]
+    assert meta["source"] == "manual.txt" and meta["type"] == "document"
+
+def test_ingest_document_upserts_precomputed_embeddings(memory_system):
+    from unittest.mock import patch
+    chunks = [f"Section {i}: configuration notes." for i in range(300)]
+    with patch.object(memory_system, "embedding_fn", wraps=memory_system.embedding_fn) as embed, \
+         patch.object(memory_system.collection, "upsert", wraps=memory_system.collection.upsert) as upsert:
+        ok, _ = memory_system.ingest_document("notes.txt", chunks)
+    assert ok
+    assert [len(c.args[0]) for c in embed.call_args_list] == [256, 44]
+    assert all(len(c.kwargs["embeddings"]) == len(c.kwargs["documents"]) for c in upsert.call_args_list)
+    assert memory_system.collection.count() == 300
+
+def test_search_classification_thresholds(memory_system):
+    from unittest.mock import patch
+    docs = ["My NAME IS Vasilis.", "Report summary.", "Manual tip.", "Auto note.", "Far manual tip."]
+    metas = [{"type": "auto"}, {"type": "document_summary"}, {"type": "manual"}, {"type": "auto"}, {"type": "manual"}]
+    dists = [1.5, 2.0, 0.6, 0.6, 0.7]
+    fake = {"documents": [docs], "metadatas": [metas], "distances": [dists], "ids": [[str(i) for i in range(5)]]}
+    with patch.object(memory_system.collection, "query", return_value=fake):
+        out = memory_system.search("docker volumes", inject_identity=False)
+    # Name memories and summaries ignore distance; the rest must clear their per-type bar
+    assert [line.split("** ")[-1] for line in out.split("\n---\n")] == ["My NAME IS Vasilis.", "Report summary.", "Manual tip."]
+    assert "Auto note." not in out and "Far manual tip." not in out
+
+def test_warm_up_queries_only_a_populated_index(memory_system):
+    from unittest.mock import patch
+    with patch.object(memory_system.collection, "query", wraps=memory_system.collection.query) as query:
+        memory_system.warm_up()
+        query.assert_not_called()
+        memory_system.add("The staging database lives on port 5433.", {"type": "manual"})
+        memory_system.warm_up()
+    assert query.call_args.kwargs["n_results"] == 1
+
+def test_reingesting_a_document_replaces_all_its_chunks(memory_system):
+    import hashlib
+    # A chunk left over from before the id change
+    memory_system.collection.add(documents=["Legacy copy of step one."], metadatas=[{"type": "document", "source": "guide.md"}],
+                                 ids=[hashlib.md5(b"guide.md_0_Legacy copy of step ").hexdigest()])
+    memory_system.ingest_document("guide.md", ["First version of step one.", "First version of step two.", "First version of step three."])
+    memory_system.ingest_document("guide.md", ["Second version of step one.", "Second version of step two."])
+    stored = memory_system.collection.get(where={"source": "guide.md"})
+    # The shorter re-ingest leaves neither the old tail chunk nor the legacy copy behind
+    assert sorted(stored["documents"]) == ["Second version of step one.", "Second version of step two."]
+    assert sorted(stored["ids"]) == sorted(hashlib.blake2b(f"guide.md_{i}".encode(), digest_size=16).hexdigest() for i in range(2))
@@ -74,9 +74,9 @@ async def test_dream_heuristics(mock_context):
     
     result = await dreamer.dream("test-model")
     
-    # Assert learn_lesson was called
-    mock_context.skill_memory.learn_lesson.assert_called()
-    call_args = mock_context.skill_memory.learn_lesson.call_args
+    # Assert the heuristics were recorded in one batch
+    mock_context.skill_memory.learn_lessons.assert_called_once()
+    call_args = mock_context.skill_memory.learn_lessons.call_args
     assert "Always use absolute paths in Docker" in str(call_args)
     assert "Dream Complete" in result
 
@@ -100,3 +100,87 @@ async def test_dream_low_entropy_guard(mock_context):
     # Assert LLM was NOT called
     mock_context.llm_client.chat_completion.assert_not_called()
     assert "Not enough entropy" in result
+
+@pytest.mark.asyncio
+async def test_dream_rejects_malformed_reply_without_touching_memory(mock_context):
+    """
+    The consolidation reply is decoded strictly; a broken reply aborts the cycle before any write.
+    """
+    dreamer = Dreamer(mock_context)
+    mock_context.memory_system.collection.get.return_value = {
+        "ids": ["1", "2", "3"],
+        "documents": ["mem1", "mem2", "mem3"],
+        "metadatas": [{}, {}, {}],
+        "embeddings": []
+    }
+    mock_context.llm_client.chat_completion.return_value = {
+        "choices": [{"message": {"content": '{"consolidations": [{"synthesis": "x", "merged_ids": ["ID:1", "ID:2"]}'}}]
+    }
+
+    result = await dreamer.dream("test-model")
+
+    assert result.startswith("Dream failed")
+    mock_context.memory_system.add.assert_not_called()
+    mock_context.memory_system.collection.delete.assert_not_called()
+
+    # Trailing prose after the object is rejected by the tail check before any parse
+    mock_context.llm_client.chat_completion.return_value = {
+        "choices": [{"message": {"content": '{"consolidations": [], "heuristics": []}\nHope this helps!'}}]
+    }
+    assert await dreamer.dream("test-model") == "Dream failed: malformed JSON"
+
+@pytest.mark.asyncio
+async def test_dream_applies_all_merges_in_one_insert_and_one_delete(mock_context):
+    dreamer = Dreamer(mock_context)
+    mock_context.memory_system.collection.get.return_value = {
+        "ids": ["1", "2", "3", "4", "5"],
+        "documents": ["mem1", "mem2", "mem3", "mem4", "mem5"],
+    }
+    mock_context.llm_client.chat_completion.return_value = {
+        "choices": [{"message": {"content": '{"consolidations": ['
+            '{"synthesis": "Fact A", "merged_ids": ["ID:1", "ID:2"]},'
+            '{"synthesis": "Fact B", "merged_ids": ["ID:3", "ID:4"]},'
+            '{"synthesis": "Lonely", "merged_ids": ["ID:5"]}], "heuristics": []}'}}]
+    }
+
+    result = await dreamer.dream("test-model")
+
+    mock_context.memory_system.add_batch.assert_called_once()
+    assert mock_context.memory_system.add_batch.call_args[0][0] == ["Fact A", "Fact B"]
+    mock_context.memory_system.collection.delete.assert_called_once_with(ids=["1", "2", "3", "4"])
+    assert result.count("Merged 2 items") == 2
+    # Syntheses are embedded by the collection's own embedding function inside that one add, never upstream
+    mock_context.llm_client.get_embeddings.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_dream_fetches_documents_only(mock_context):
+    dreamer = Dreamer(mock_context)
+    mock_context.memory_system.collection.get.return_value = {"ids": ["1"], "documents": ["mem1"]}
+    await dreamer.dream("test-model")
+    assert mock_context.memory_system.collection.get.call_args.kwargs["include"] == ["documents"]
+
+@pytest.mark.asyncio
+async def test_dream_runs_chroma_and_playbook_io_off_the_event_loop(mock_context):
+    import threading
+    loop_thread = threading.get_ident()
+    io_threads = {}
+
+    def record(name, value=None):
+        def call(*args, **kwargs):
+            io_threads[name] = threading.get_ident()
+            return value
+        return call
+
+    mock_context.memory_system.collection.get.side_effect = record(
+        "get", {"ids": ["1", "2", "3"], "documents": ["mem1", "mem2", "mem3"]}
+    )
+    mock_context.memory_system.add_batch.side_effect = record("add_batch")
+    mock_context.memory_system.collection.delete.side_effect = record("delete")
+    mock_context.skill_memory.learn_lessons.side_effect = record("learn_lessons")
+    mock_context.llm_client.chat_completion.return_value = {
+        "choices": [{"message": {"content": '{"consolidations": [{"synthesis": "Fact", "merged_ids": ["ID:1", "ID:2"]}], "heuristics": ["Rule"]}'}}]
+    }
+    await Dreamer(mock_context).dream("test-model")
+
+    assert set(io_threads) == {"get", "add_batch", "delete", "learn_lessons"}
+    assert loop_thread not in io_threads.values()
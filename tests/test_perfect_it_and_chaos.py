@@ -1,6 +1,8 @@
+import asyncio
 import pytest
 from unittest.mock import MagicMock, AsyncMock, patch
 from ghost_agent.core.agent import GhostAgent
+from ghost_agent.core.schemas import FINAL_ANSWER_FORMAT, LESSON_REPORT_FORMAT
 
 @pytest.fixture
 def agent():
@@ -111,7 +113,7 @@ async def test_massive_output_truncation(agent):
         {"choices": [{"message": {"content": "Output too big."}}]}
     ]
     
-    await agent.handle_chat({"messages": [{"role": "user", "content": "Run big output"}]}, [])
+    await agent.handle_chat({"messages": [{"role": "user", "content": "Run big output"}]}, MagicMock())
     
     last_call_args = agent.context.llm_client.chat_completion.call_args_list[1][0][0]
     messages = last_call_args["messages"]
@@ -121,6 +123,28 @@ async def test_massive_output_truncation(agent):
     assert "TRUNCATED" in tool_msg["content"]
     assert len(tool_msg["content"]) < 6000 # Should be around 4000 + overhead
 
+@pytest.mark.asyncio
+async def test_oversized_output_truncated_off_loop(agent):
+    """
+    Byte outputs above the offload threshold are coerced and truncated in a worker thread.
+    """
+    agent.available_tools["test_tool"].return_value = b"B" * 200_000
+    agent.context.llm_client.chat_completion.side_effect = [
+        {"choices": [{"message": {"content": None, "tool_calls": [{
+            "id": "call_big", "function": {"name": "test_tool", "arguments": "{}"}
+        }]}}]},
+        {"choices": [{"message": {"content": "Done."}}]}
+    ]
+
+    with patch("ghost_agent.core.agent.asyncio.to_thread", wraps=asyncio.to_thread) as to_thread:
+        await agent.handle_chat({"messages": [{"role": "user", "content": "Dump it"}]}, MagicMock())
+
+    assert to_thread.call_count == 1
+    messages = agent.context.llm_client.chat_completion.call_args_list[1][0][0]["messages"]
+    tool_msg = next(m for m in messages if m.get("role") == "tool")
+    assert "TRUNCATED" in tool_msg["content"]
+    assert len(tool_msg["content"]) < 4100
+
 @pytest.mark.asyncio
 async def test_infinite_loop_trap(agent):
     """
@@ -159,3 +183,304 @@ async def test_infinite_loop_trap(agent):
     
     assert blocked_msg["name"] == "test_tool"
     assert "SYSTEM MONITOR: Already executed successfully" in blocked_msg["content"]
+
+@pytest.mark.asyncio
+async def test_perfect_it_batches_post_mortem(agent):
+    """
+    When both the optimization answer and the post-mortem are due, they come
+    back from a single JSON request.
+    """
+    agent.context.llm_client.chat_completion.side_effect = [
+        {"choices": [{"message": {"content": None, "tool_calls": [{
+            "id": "call_1", "function": {"name": "execute", "arguments": '{"code": "print(1)"}'}
+        }]}}]},
+        {"choices": [{"message": {"content": "It failed"}}]},
+        {"choices": [{"message": {"content": '{"final_answer": "Fixed. Consider caching.", "lesson": {"task": "t", "mistake": "m", "solution": "s"}}'}}]},
+    ]
+    agent.available_tools["execute"].return_value = "EXIT CODE: 1\nSTDOUT/STDERR:\nboom"
+    background_tasks = MagicMock()
+
+    result, _, req_id = await agent.handle_chat({"messages": [{"role": "user", "content": "Run code"}]}, background_tasks)
+
+    calls = agent.context.llm_client.chat_completion.call_args_list
+    assert len(calls) == 3
+    assert calls[-1][0][0]["response_format"] == FINAL_ANSWER_FORMAT
+    assert "tools" not in calls[-1][0][0]
+    assert result == "It failed\n\nFixed. Consider caching."
+    # The lesson is stored after the response, not on the request path
+    agent.context.skill_memory.learn_lesson.assert_not_called()
+    background_tasks.add_task.assert_called_once()
+    runner, task_req_id, job, lesson = background_tasks.add_task.call_args[0]
+    assert (runner, task_req_id, job) == (agent._run_in_request, req_id, agent._store_lesson)
+    await runner(task_req_id, job, lesson)
+    assert agent.context.skill_memory.learn_lesson.call_args[0][:3] == ("t", "m", "s")
+
+def _perfect_it_replies(*final_replies):
+    return [
+        {"choices": [{"message": {"content": None, "tool_calls": [{
+            "id": "call_1", "function": {"name": "execute", "arguments": '{"code": "print(1)"}'}
+        }]}}]},
+        {"choices": [{"message": {"content": "It failed"}}]},
+    ] + [{"choices": [{"message": {"content": c}}]} for c in final_replies]
+
+@pytest.mark.asyncio
+async def test_folded_reply_with_empty_answer_is_not_shown_raw(agent):
+    agent.context.llm_client.chat_completion.side_effect = _perfect_it_replies('{"final_answer": "", "lesson": null}')
+    agent.available_tools["execute"].return_value = "EXIT CODE: 1\nSTDOUT/STDERR:\nboom"
+    background_tasks = MagicMock()
+
+    result, _, _ = await agent.handle_chat({"messages": [{"role": "user", "content": "Run code"}]}, background_tasks)
+
+    assert result == "It failed"
+    # Parsed, so the post-mortem is settled: nothing is queued for a null lesson
+    background_tasks.add_task.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_unparseable_folded_reply_falls_back_to_plain_perfect_it(agent):
+    agent.context.llm_client.chat_completion.side_effect = _perfect_it_replies('{"final_answer": "Fixed. Cons', "Fixed. Consider caching.")
+    agent.available_tools["execute"].return_value = "EXIT CODE: 1\nSTDOUT/STDERR:\nboom"
+    background_tasks = MagicMock()
+
+    result, _, _ = await agent.handle_chat({"messages": [{"role": "user", "content": "Run code"}]}, background_tasks)
+
+    assert result == "It failed\n\nFixed. Consider caching."
+    retry = agent.context.llm_client.chat_completion.call_args_list[-1][0][0]
+    assert "response_format" not in retry and "RESPOND IN PLAIN TEXT ONLY" in retry["messages"][-1]["content"]
+    # The post-mortem is still owed and runs separately
+    assert background_tasks.add_task.call_args[0][2] == agent._run_post_mortem
+
+@pytest.mark.asyncio
+async def test_post_mortem_is_deferred_to_background(agent):
+    """The auto-learning post-mortem is queued as a background task, not awaited inline."""
+    agent.context.llm_client.chat_completion.side_effect = [
+        {"choices": [{"message": {"content": None, "tool_calls": [{
+            "id": "call_1", "function": {"name": "test_tool", "arguments": '{}'}
+        }]}}]},
+        {"choices": [{"message": {"content": None, "tool_calls": [{
+            "id": "call_2", "function": {"name": "execute", "arguments": '{"code": "x"}'}
+        }]}}]},
+        {"choices": [{"message": {"content": "The script failed with a long explanation of why it failed."}}]},
+    ]
+    agent.available_tools["execute"].return_value = "EXIT CODE: 1\nSTDOUT/STDERR:\nboom"
+    background_tasks = MagicMock()
+
+    await agent.handle_chat({"messages": [{"role": "user", "content": "Run code"}]}, background_tasks)
+
+    assert agent.context.llm_client.chat_completion.call_count == 3
+    background_tasks.add_task.assert_called_once()
+    runner, request_id, func, history_summary, final_ai_content, model = background_tasks.add_task.call_args[0]
+    assert runner == agent._run_in_request
+    assert func == agent._run_post_mortem
+    assert "Tool execute" in history_summary
+    assert final_ai_content.startswith("The script failed")
+
+@pytest.mark.asyncio
+async def test_carriage_returns_and_nuls_are_stripped(agent):
+    agent.context.llm_client.chat_completion.side_effect = [
+        {"choices": [{"message": {"content": "Sure."}}]},
+    ]
+
+    await agent.handle_chat({"messages": [{"role": "user", "content": "line one\r\nline\x00 two"}]}, MagicMock())
+
+    sent = agent.context.llm_client.chat_completion.call_args_list[0][0][0]["messages"]
+    user_msg = next(m for m in sent if m["role"] == "user")
+    assert user_msg["content"] == "line one\nline two"
+
+@pytest.mark.asyncio
+async def test_background_job_logs_under_original_request_id(agent):
+    from ghost_agent.utils.logging import request_id_context
+    seen = []
+
+    async def job(x):
+        seen.append((x, request_id_context.get()))
+
+    await agent._run_in_request("abc123", job, 1)
+    assert seen == [(1, "abc123")]
+    assert request_id_context.get() == "SYSTEM"
+
+@pytest.mark.asyncio
+async def test_perfect_it_skipped_for_short_complete_answer(agent):
+    agent.context.llm_client.chat_completion.side_effect = [
+        {"choices": [{"message": {"content": None, "tool_calls": [{
+            "id": "call_1", "function": {"name": "execute", "arguments": '{"code": "x"}'}
+        }]}}]},
+        {"choices": [{"message": {"content": "The answer is 42."}}]},
+    ]
+    agent.available_tools["execute"].return_value = "EXIT CODE: 1\nSTDOUT/STDERR:\nboom"
+
+    result, _, _ = await agent.handle_chat({"messages": [{"role": "user", "content": "Compute it"}]}, MagicMock())
+
+    assert agent.context.llm_client.chat_completion.call_count == 2
+    assert result == "The answer is 42."
+
+@pytest.mark.asyncio
+async def test_dynamic_system_sections_are_replaced_not_stacked(agent):
+    agent.context.scratchpad.list_all.side_effect = ["v1", "v2", "v3"]
+    replies = iter([
+        {"choices": [{"message": {"content": None, "tool_calls": [{
+            "id": "call_1", "function": {"name": "test_tool", "arguments": '{"n": 1}'}
+        }]}}]},
+        {"choices": [{"message": {"content": "All done."}}]},
+    ])
+    prompts = []
+
+    async def fake_completion(payload, **kwargs):
+        prompts.append(payload["messages"][0]["content"])  # snapshot: the dict is updated in place
+        return next(replies)
+
+    agent.context.llm_client.chat_completion.side_effect = fake_completion
+
+    await agent.handle_chat({"messages": [{"role": "user", "content": "Run code"}]}, MagicMock())
+
+    first, second = prompts
+    for prompt in (first, second):
+        assert prompt.count("### SCRAPBOOK (Persistent Data)") == 1
+        assert prompt.count("### CURRENT SANDBOX STATE (Eyes-On)") == 1
+    assert first.endswith("### SCRAPBOOK (Persistent Data):\nv1\n\n")
+    assert second.endswith("### SCRAPBOOK (Persistent Data):\nv2\n\n")
+
+@pytest.mark.asyncio
+async def test_release_unused_ram_runs_every_trim_interval(agent, monkeypatch):
+    import ghost_agent.core.agent as agent_mod
+    monkeypatch.setattr(agent_mod, "_MEMORY_TRIM_INTERVAL", 3)
+    agent.release_unused_ram = MagicMock()
+    agent.context.llm_client.chat_completion.return_value = {"choices": [{"message": {"content": "Hello there."}}]}
+
+    for _ in range(7):
+        await agent.handle_chat({"messages": [{"role": "user", "content": "hello"}]}, MagicMock())
+
+    assert agent.release_unused_ram.call_count == 2
+
+@pytest.mark.asyncio
+async def test_null_user_content_does_not_break_intent_detection(agent):
+    agent.context.llm_client.chat_completion.return_value = {"choices": [{"message": {"content": "Hello there."}}]}
+    msgs = [{"role": "user", "content": "hi"}, {"role": "assistant", "content": "Hey."}, {"role": "user", "content": None}]
+    result = await agent.handle_chat({"messages": msgs}, MagicMock())
+    assert result[0] == "Hello there."
+
+@pytest.mark.asyncio
+async def test_turn_payload_is_reused_across_turns(agent):
+    seen = []
+
+    async def fake_completion(payload, **kwargs):
+        seen.append((id(payload), payload["temperature"], len(payload["messages"])))
+        if len(seen) == 1:
+            return {"choices": [{"message": {"content": "", "tool_calls": [{"id": "c1", "type": "function", "function": {"name": "test_tool", "arguments": "{}"}}]}}]}
+        return {"choices": [{"message": {"content": "Done."}}]}
+
+    agent.context.llm_client.chat_completion.side_effect = fake_completion
+    await agent.handle_chat({"messages": [{"role": "user", "content": "run the test tool"}]}, MagicMock())
+
+    assert len(seen) == 2
+    assert seen[0][0] == seen[1][0]
+    # The reused dict still carries the grown history on the second turn
+    assert seen[1][2] > seen[0][2]
+
+@pytest.mark.asyncio
+async def test_sandbox_refresh_overlaps_planner_request(agent):
+    agent.context.args.use_planning = True
+    sandbox_started = asyncio.Event()
+
+    async def slow_sandbox():
+        sandbox_started.set()
+        return "a.py"
+
+    async def fake_completion(payload, **kwargs):
+        if "response_format" in payload:
+            # The planner only returns once the sandbox refresh is already running
+            await asyncio.wait_for(sandbox_started.wait(), timeout=1)
+            return {"choices": [{"message": {"content": '{"thought": "run it", "next_action_id": "1"}'}}]}
+        return {"choices": [{"message": {"content": "Ran the script."}}]}
+
+    agent._get_sandbox_state = slow_sandbox
+    agent.context.llm_client.chat_completion.side_effect = fake_completion
+    result = await agent.handle_chat({"messages": [{"role": "user", "content": "execute the python script run.py"}]}, MagicMock())
+
+    assert result[0] == "Ran the script."
+    sent = agent.context.llm_client.chat_completion.call_args_list[-1][0][0]["messages"]
+    assert "a.py" in sent[0]["content"]
+    assert any("THOUGHT: run it" in m["content"] for m in sent if m["role"] == "system")
+
+@pytest.mark.asyncio
+async def test_seen_tools_evicts_least_recent_call(agent, monkeypatch):
+    import ghost_agent.core.agent as agent_mod
+    monkeypatch.setattr(agent_mod, "_SEEN_TOOLS_MAX", 1)
+
+    def call(args):
+        return {"choices": [{"message": {"content": "", "tool_calls": [{"id": args, "type": "function", "function": {"name": "test_tool", "arguments": args}}]}}]}
+
+    agent.context.llm_client.chat_completion.side_effect = [
+        call('{"q": "a"}'), call('{"q": "b"}'), call('{"q": "a"}'),
+        {"choices": [{"message": {"content": "Done."}}]},
+    ]
+    await agent.handle_chat({"messages": [{"role": "user", "content": "look things up"}]}, MagicMock())
+
+    # "a" was pushed out by "b", so its repeat runs again instead of being blocked as a duplicate
+    assert agent.available_tools["test_tool"].await_count == 3
+
+@pytest.mark.asyncio
+async def test_planner_thought_meta_intent_keeps_loop_running_after_execute(agent):
+    agent.context.args.use_planning = True
+    turns = []
+
+    async def fake_completion(payload, **kwargs):
+        if "response_format" in payload:
+            return {"choices": [{"message": {"content": '{"thought": "Run it, then save the lesson.", "next_action_id": "1"}'}}]}
+        turns.append("tools" in payload)
+        if len(turns) == 1:
+            return {"choices": [{"message": {"content": "", "tool_calls": [{"id": "c1", "type": "function", "function": {"name": "execute", "arguments": '{"filename": "a.py", "content": "print(1)"}'}}]}}]}
+        return {"choices": [{"message": {"content": "Ran it and noted the lesson."}}]}
+
+    agent.context.llm_client.chat_completion.side_effect = fake_completion
+    agent._run_critic_check = AsyncMock(return_value=(True, None, ""))
+    await agent.handle_chat({"messages": [{"role": "user", "content": "execute a.py for me"}]}, MagicMock())
+
+    # A successful execute only ends the loop when nobody asked for a skill/profile update,
+    # so the follow-up is a regular tool-enabled turn rather than the Perfect-It call
+    assert turns == [True, True]
+
+@pytest.mark.asyncio
+async def test_time_and_profile_sit_next_to_the_newest_user_turn(agent):
+    sent = []
+
+    async def capture(payload, *args, **kwargs):
+        sent.append([dict(m) for m in payload["messages"]])
+        return {"choices": [{"message": {"content": "Sure."}}]}
+
+    agent.context.llm_client.chat_completion.side_effect = capture
+    agent.context.profile_memory.get_context_string.return_value = "Name: Ada"
+    history = [
+        {"role": "user", "content": "Tell me a fact about otters"},
+        {"role": "assistant", "content": "Otters hold hands while sleeping."},
+        {"role": "user", "content": "And one about owls"},
+    ]
+    await agent.handle_chat({"messages": history}, MagicMock())
+
+    msgs = sent[0]
+    assert "CURRENT TIME" not in msgs[0]["content"] and "Ada" not in msgs[0]["content"]
+    assert msgs[-2]["role"] == "system" and msgs[-2]["content"].startswith("### CONTEXT\nCURRENT TIME: ")
+    assert "USER PROFILE: Name: Ada" in msgs[-2]["content"]
+    assert msgs[-1]["content"] == "And one about owls"
+    assert sum("CURRENT TIME" in str(m.get("content")) for m in msgs) == 1
+
+@pytest.mark.asyncio
+async def test_post_mortem_is_schema_constrained_and_accepts_no_lesson(agent):
+    agent.context.llm_client.chat_completion.side_effect = [
+        {"choices": [{"message": {"content": '{"lesson": null}'}}]},
+        {"choices": [{"message": {"content": '{"lesson": {"task": "t", "mistake": "null deref", "solution": "s"}}'}}]},
+    ]
+    await agent._run_post_mortem("User: a\n", "done", "m")
+    agent.context.skill_memory.learn_lesson.assert_not_called()
+
+    await agent._run_post_mortem("User: b\n", "done again", "m")
+    assert agent.context.llm_client.chat_completion.call_args[0][0]["response_format"] == LESSON_REPORT_FORMAT
+    # A lesson that merely mentions "null" is still recorded
+    assert agent.context.skill_memory.learn_lesson.call_args[0][:3] == ("t", "null deref", "s")
+
+@pytest.mark.asyncio
+async def test_repeated_post_mortem_is_served_from_the_llm_cache(agent):
+    agent.context.llm_client.chat_completion.side_effect = None
+    agent.context.llm_client.chat_completion.return_value = {"choices": [{"message": {"content": '{"lesson": null}'}}]}
+    await agent._run_post_mortem("User: a\n", "done", "m")
+    await agent._run_post_mortem("User: a\n", "done", "m")
+    assert agent.context.llm_client.chat_completion.await_count == 1
@@ -0,0 +1,48 @@
+import os
+import orjson
+import pytest
+from ghost_agent.memory.profile import ProfileMemory
+
+def test_profile_is_read_once_and_written_atomically(tmp_path, monkeypatch):
+    profile = ProfileMemory(tmp_path)
+    reads = []
+    real_read = type(profile.file_path).read_bytes
+    monkeypatch.setattr(type(profile.file_path), "read_bytes", lambda self: reads.append(self) or real_read(self))
+
+    profile.update("root", "location", "Athens")
+    profile.update("car", "car", "Saab")
+    assert "- location: Athens" in profile.get_context_string()
+    assert profile.get_context_string() is profile.get_context_string()
+    assert reads == []
+
+    on_disk = orjson.loads(profile.file_path.read_bytes())
+    assert on_disk["root"]["location"] == "Athens" and on_disk["assets"]["car"] == "Saab"
+    assert not profile.file_path.with_suffix(".json.tmp").exists()
+
+def test_external_edits_are_picked_up(tmp_path):
+    profile = ProfileMemory(tmp_path)
+    assert "Rex" not in profile.get_context_string()
+    profile.file_path.write_bytes(orjson.dumps({"root": {"name": "User"}, "pets": {"dog": "Rex"}}))
+    # Make sure the stamp differs even on coarse-mtime filesystems
+    st = profile.file_path.stat()
+    os.utime(profile.file_path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert "- dog: Rex" in profile.get_context_string()
+
+def test_load_returns_a_copy_safe_to_iterate_while_deleting(tmp_path):
+    profile = ProfileMemory(tmp_path)
+    profile.update("pets", "dog", "Rex")
+    data = profile.load()
+    for cat, sub in data.items():
+        if isinstance(sub, dict):
+            for k in list(sub):
+                if k == "dog":
+                    profile.delete(cat, k)
+    assert "pets" in data and "pets" not in profile.load()
+
+def test_failed_write_drops_the_mutated_cache(tmp_path, monkeypatch):
+    profile = ProfileMemory(tmp_path)
+    monkeypatch.setattr(os, "replace", lambda *a: (_ for _ in ()).throw(OSError("disk full")))
+    with pytest.raises(OSError):
+        profile.update("root", "location", "Athens")
+    monkeypatch.undo()
+    assert "Athens" not in profile.get_context_string()
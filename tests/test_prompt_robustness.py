@@ -25,3 +25,155 @@ def test_code_system_prompt_has_observability():
     """Verify observability requirements."""
     assert "ABSOLUTE OBSERVABILITY" in CODE_SYSTEM_PROMPT
     assert "MUST use `print()`" in CODE_SYSTEM_PROMPT
+
+def test_render_prompt_fills_placeholders_in_one_pass():
+    from ghost_agent.core.prompts import REQUEST_CONTEXT_PROMPT, render_prompt
+    rendered = render_prompt(REQUEST_CONTEXT_PROMPT, PROFILE="Name: Ada", CURRENT_TIME="2025-01-01 00:00:00")
+    assert "{{" not in rendered
+    assert "USER PROFILE: Name: Ada" in rendered
+    # Values are inserted literally, even when they look like placeholders themselves
+    assert render_prompt("{{A}} {{B}}", A="{{B}}") == "{{B}} {{B}}"
+
+def test_each_prompt_has_one_lazily_loaded_file():
+    import ghost_agent.core.prompts as prompts_mod
+    files = list(prompts_mod._PROMPT_FILES.values())
+    assert len(files) == len(set(files))
+    for attr, name in prompts_mod._PROMPT_FILES.items():
+        assert getattr(prompts_mod, attr) == prompts_mod.get(name) and prompts_mod.get(name).strip()
+    with pytest.raises(AttributeError):
+        prompts_mod.NOT_A_PROMPT
+
+@pytest.mark.parametrize("name", ["SYSTEM_PROMPT", "CODE_SYSTEM_PROMPT", "DBA_SYSTEM_PROMPT"])
+def test_persona_prompts_are_fully_static(name):
+    import ghost_agent.core.prompts as prompts_mod
+    assert "{{" not in getattr(prompts_mod, name)
+
+def test_render_prompt_parses_each_template_once():
+    from ghost_agent.core.prompts import REQUEST_CONTEXT_PROMPT, render_prompt, _split_template
+    _split_template.cache_clear()
+    first = render_prompt(REQUEST_CONTEXT_PROMPT, PROFILE="p1", CURRENT_TIME="t1")
+    second = render_prompt(REQUEST_CONTEXT_PROMPT, PROFILE="p2", CURRENT_TIME="t2")
+    assert _split_template.cache_info().misses == 1 and _split_template.cache_info().hits == 1
+    assert first == "### CONTEXT\nCURRENT TIME: t1\nUSER PROFILE: p1\n"
+    assert second == "### CONTEXT\nCURRENT TIME: t2\nUSER PROFILE: p2\n"
+    assert render_prompt("{{X}} and {{Y}}", Y="y") == "{{X}} and y"
+
+def test_rarely_used_prompts_load_on_first_touch_only():
+    import os, subprocess, sys, textwrap
+    script = textwrap.dedent("""
+        import ghost_agent.core.agent, ghost_agent.core.dream
+        import ghost_agent.core.prompts as p
+        loaded = set(vars(p)) & set(p._PROMPT_FILES)
+        assert loaded == {"SYSTEM_PROMPT", "CODE_SYSTEM_PROMPT", "REQUEST_CONTEXT_PROMPT"}, loaded
+        from ghost_agent.core.prompts import DBA_SYSTEM_PROMPT
+        assert vars(p)["DBA_SYSTEM_PROMPT"] is DBA_SYSTEM_PROMPT
+    """)
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)}
+    subprocess.run([sys.executable, "-c", script], check=True, env=env)
+
+def test_prompt_texts_are_interned():
+    import sys
+    from ghost_agent.core.prompts import get
+    get.cache_clear()
+    text = get("critic")
+    assert sys.intern("".join(list(text))) is text
+
+def test_json_side_calls_use_their_schemas():
+    from ghost_agent.core import schemas
+    from ghost_agent.core.prompts import PLANNING_SYSTEM_PROMPT, CRITIC_SYSTEM_PROMPT, SMART_MEMORY_PROMPT
+    for fmt, prompt in (
+        (schemas.PLAN_UPDATE_FORMAT, PLANNING_SYSTEM_PROMPT),
+        (schemas.CRITIC_VERDICT_FORMAT, CRITIC_SYSTEM_PROMPT),
+        (schemas.MEMORY_SCORE_FORMAT, SMART_MEMORY_PROMPT),
+    ):
+        assert fmt["type"] == "json_schema"
+        spec = fmt["json_schema"]
+        assert f"`{spec['name']}` schema" in prompt
+        # Every field the prompt describes is one the schema requires
+        assert set(spec["schema"]["required"]) <= set(spec["schema"]["properties"])
+        for field in spec["schema"]["required"]:
+            assert f'"{field}"' in prompt
+
+def test_smart_memory_rubric_is_rendered_from_the_scoring_table():
+    import ghost_agent.core.prompts as prompts_mod
+    prompt = prompts_mod.SMART_MEMORY_PROMPT
+    assert "{{" not in prompt
+    for score, label, _, _ in prompts_mod._SCORING:
+        assert prompt.count(f"- {score:.1f} : {label}") == 1
+    assert "- 1.0 : EXPLICIT IDENTITY (Names, locations, professions). -> TRIGGERS PROFILE UPDATE." in prompt
+
+@pytest.mark.parametrize("name", ["SYSTEM_PROMPT", "CODE_SYSTEM_PROMPT", "DBA_SYSTEM_PROMPT"])
+def test_persona_prompts_carry_no_clock(name):
+    import ghost_agent.core.prompts as prompts_mod
+    assert "CURRENT_TIME" not in getattr(prompts_mod, name)
+
+def test_prompt_backslashes_are_only_the_documented_ones():
+    # Prompt files are read verbatim, so a stray "\n" would reach the model as two literal characters
+    import re
+    import ghost_agent.core.prompts as prompts_mod
+    allowed = ("backslash `\\`", "no literal \\n")
+    for name in prompts_mod._PROMPT_FILES.values():
+        text = prompts_mod.get(name)
+        for phrase in allowed:
+            text = text.replace(phrase, "")
+        assert "\\" not in text, name
+
+def test_prompts_table_is_read_only_and_lazy():
+    from ghost_agent.core.prompts import PROMPTS, get, SYSTEM_PROMPT
+    assert PROMPTS["system"] is SYSTEM_PROMPT
+    assert set(PROMPTS) >= {"system", "code", "dba", "critic", "planning"}
+    assert dict(PROMPTS)["critic"] == get("critic")
+    with pytest.raises(KeyError):
+        PROMPTS["missing"]
+    with pytest.raises(TypeError):
+        PROMPTS["system"] = "tampered"
+
+def test_tool_map_is_generated_from_the_registry(monkeypatch):
+    from ghost_agent.tools import registry
+    from ghost_agent.core.prompts import SYSTEM_PROMPT
+    defined = {t["function"]["name"] for t in registry.TOOL_DEFINITIONS}
+    for label, tools, _ in registry.TOOL_TRIGGERS:
+        assert set(tools) <= defined, label
+        assert f"- {label}: " in SYSTEM_PROMPT
+    assert "{{TOOL_MAP}}" not in SYSTEM_PROMPT
+
+    # A trigger whose tool is gone is dropped rather than advertised
+    monkeypatch.setattr(registry, "TOOL_DEFINITIONS", [t for t in registry.TOOL_DEFINITIONS if t["function"]["name"] != "dream_mode"])
+    assert "dream_mode" not in registry.tool_trigger_map() and "`execute`" in registry.tool_trigger_map()
+
+def test_validate_prompts_flags_placeholders_and_short_prefixes(monkeypatch):
+    import ghost_agent.core.prompts as p
+    p.validate_prompts()
+    with pytest.raises(ValueError, match="tokens <"):
+        p.validate_prompts(min_tokens=10**6)
+
+    monkeypatch.setattr(p, "get", lambda name: "PERSONA {{CURRENT_TIME}}" if name == "dba" else "PERSONA")
+    with pytest.raises(ValueError, match=r"dba: unrendered placeholders \['CURRENT_TIME'\]"):
+        p.validate_prompts()
+
+def test_prompt_validation_runs_at_import_when_enabled():
+    import os, subprocess, sys
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(sys.path), "GHOST_VALIDATE_PROMPTS": "1"}
+    subprocess.run([sys.executable, "-c", "import ghost_agent.core.prompts"], check=True, env=env)
+    failed = subprocess.run([sys.executable, "-c", "import ghost_agent.core.prompts"],
+                            env={**env, "GHOST_MIN_CACHE_TOKENS": "1000000"}, capture_output=True, text=True)
+    assert failed.returncode != 0 and "Prompt validation failed" in failed.stderr
+
+def test_model_facing_text_has_no_cosmetic_markdown():
+    import re
+    from ghost_agent.core.prompts import PROMPTS
+    from ghost_agent.tools.registry import TOOL_DEFINITIONS_JSON
+    # Emoji and **bold** cost extra prefill tokens on every request and carry no instructions
+    texts = dict(PROMPTS, tools=TOOL_DEFINITIONS_JSON.decode())
+    for name, text in texts.items():
+        assert not re.search(r"[^\x00-\x7F]", text), name
+        assert not re.search(r"\*\*[^*\s]", text), name
+
+def test_mandatory_triggers_keep_their_conditions():
+    from ghost_agent.core.prompts import SYSTEM_PROMPT
+    for line in (
+        "- SLEEP/REST: If the user asks you to sleep, rest, or extract heuristics, YOU MUST ONLY call `dream_mode`.",
+        "- FACTS: If a verifiable claim is made, use `fact_check` or `deep_research`.",
+        '- HEALTH/DIAGNOSTICS: Use `system_utility(action="check_health")` to check system status.',
+    ):
+        assert line in SYSTEM_PROMPT
@@ -47,3 +47,35 @@ async def test_critic_fail_open(agent):
     assert approved is True
     assert revised is None
     assert "Fail-Open" in critique
+
+@pytest.mark.asyncio
+async def test_audit_and_execute_runs_patched_code(agent):
+    """A revised verdict patches the tool arguments before execution."""
+    agent.context.llm_client.chat_completion.return_value = {
+        "choices": [{"message": {"content": '{"status": "REVISED", "critique": "Unsafe", "revised_code": "print(\'safe\')"}'}}]
+    }
+    agent.available_tools["execute"] = AsyncMock(return_value="EXIT CODE: 0")
+    tool = {"id": "call_1", "function": {"name": "execute", "arguments": "{}"}}
+    t_args = {"filename": "a.py", "content": "import os"}
+
+    red_team_msg, result = await agent._audit_and_execute(tool, t_args, "task", "test-model")
+
+    assert "RED TEAM INTERVENTION" in red_team_msg["content"]
+    assert result == "EXIT CODE: 0"
+    agent.available_tools["execute"].assert_awaited_once_with(filename="a.py", content="print('safe')")
+    assert "print('safe')" in tool["function"]["arguments"]
+
+@pytest.mark.asyncio
+async def test_audit_and_execute_blocks_without_revision(agent):
+    """A rejected script without a revision is never executed."""
+    agent.context.llm_client.chat_completion.return_value = {
+        "choices": [{"message": {"content": '{"status": "REVISED", "critique": "rm -rf /"}'}}]
+    }
+    agent.available_tools["execute"] = AsyncMock()
+    tool = {"id": "call_1", "function": {"name": "execute", "arguments": "{}"}}
+
+    red_team_msg, result = await agent._audit_and_execute(tool, {"content": "rm -rf /"}, "task", "test-model")
+
+    assert result is None
+    assert red_team_msg["role"] == "tool" and "RED TEAM BLOCK" in red_team_msg["content"]
+    agent.available_tools["execute"].assert_not_awaited()
@@ -100,3 +100,15 @@ def test_sanitizer_resilience():
     clean, error = sanitize_code(bad_code, "test.py")
     assert error is not None
     assert "SyntaxError" in str(error)
+
+@pytest.mark.asyncio
+async def test_critic_strips_triple_backticks_without_newline(agent):
+    # Case: Single-line fence with no language and no newline
+    _, revised, _ = await mock_critic_response(agent, "```print('Fenced')```")
+    assert revised == "print('Fenced')"
+
+@pytest.mark.asyncio
+async def test_critic_keeps_plain_code_untouched(agent):
+    dirty_code = "    x = 1\n    print(x)"
+    _, revised, _ = await mock_critic_response(agent, dirty_code)
+    assert revised == dirty_code
@@ -0,0 +1,55 @@
+import json
+import orjson
+from unittest.mock import MagicMock
+from ghost_agent.memory.skills import SkillMemory
+
+def read_playbook(skills):
+    # The log is append-only (oldest first); the playbook is read newest first
+    return [json.loads(line) for line in skills.file_path.read_text().splitlines()][::-1]
+
+def test_learn_lessons_writes_playbook_and_index_once(tmp_path):
+    skills = SkillMemory(tmp_path)
+    skills.learn_lesson("old task", "old mistake", "old fix")
+    memory_system = MagicMock()
+
+    skills.learn_lessons([("t1", "m1", "s1"), ("t2", "m2", "s2")], memory_system=memory_system)
+
+    playbook = read_playbook(skills)
+    # Newest first, exactly as if each lesson had been learned one after another
+    assert [p["task"] for p in playbook] == ["t2", "t1", "old task"]
+    memory_system.add_batch.assert_called_once()
+    texts, metas = memory_system.add_batch.call_args[0]
+    assert texts == ["SITUATION: t1\nMISTAKE: m1\nSOLUTION: s1", "SITUATION: t2\nMISTAKE: m2\nSOLUTION: s2"]
+    assert all(m["type"] == "skill" for m in metas)
+
+def test_learn_lessons_keeps_fifty_newest(tmp_path):
+    skills = SkillMemory(tmp_path)
+    skills.learn_lessons([(f"t{i}", "m", "s") for i in range(60)])
+    kept = [p["task"] for p in skills._lessons]
+    assert len(kept) == 50
+    assert kept[0] == "t59"
+    # The log itself is only trimmed on compaction, but a reload keeps the same fifty
+    assert [p["task"] for p in SkillMemory(tmp_path)._lessons] == kept
+
+def test_lessons_append_without_rereading_and_compact_when_long(tmp_path, monkeypatch):
+    skills = SkillMemory(tmp_path)
+    monkeypatch.setattr(type(skills.file_path), "read_bytes", lambda self: (_ for _ in ()).throw(AssertionError("re-read")))
+    for i in range(100):
+        skills.learn_lesson(f"t{i}", "m", "s")
+    assert len(skills.file_path.read_text().splitlines()) == 100
+    assert "1. SITUATION: t99" in skills.get_playbook_context()
+
+    skills.learn_lesson("t100", "m", "s")
+    assert len(skills.file_path.read_text().splitlines()) == 50
+    assert read_playbook(skills)[0]["task"] == "t100"
+
+def test_legacy_json_playbook_is_migrated_and_torn_lines_skipped(tmp_path):
+    legacy = [{"timestamp": "x", "task": "newer", "mistake": "m", "solution": "s"},
+              {"timestamp": "x", "task": "older", "mistake": "m", "solution": "s"}]
+    (tmp_path / "skills_playbook.json").write_bytes(orjson.dumps(legacy))
+    skills = SkillMemory(tmp_path)
+    assert [p["task"] for p in read_playbook(skills)] == ["newer", "older"]
+
+    with open(skills.file_path, "ab") as f:
+        f.write(b'{"timestamp": "x", "task": "tor')
+    assert [p["task"] for p in SkillMemory(tmp_path)._lessons] == ["newer", "older"]
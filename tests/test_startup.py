@@ -0,0 +1,51 @@
+import asyncio
+import pytest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+from ghost_agent.main import lifespan
+
+def make_app(tmp_path, no_memory=False):
+    args = SimpleNamespace(upstream_url="http://127.0.0.1:8080", no_memory=no_memory)
+    context = SimpleNamespace(tor_proxy=None, sandbox_dir=tmp_path / "sandbox", memory_dir=tmp_path,
+                              sandbox_manager=None, profile_memory=None, memory_system=None,
+                              scheduler=None, llm_client=None)
+    return SimpleNamespace(state=SimpleNamespace(args=args, context=context))
+
+@pytest.mark.asyncio
+async def test_memory_warm_up_runs_in_background(tmp_path):
+    app = make_app(tmp_path)
+    memory = MagicMock()
+    memory.collection.count.return_value = 3
+    with patch("ghost_agent.main.VectorMemory", return_value=memory), \
+         patch("ghost_agent.main.DockerSandbox"), \
+         patch("ghost_agent.main.GhostAgent"):
+        async with lifespan(app):
+            await asyncio.sleep(0.05)
+            memory.warm_up.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_subsystems_start_concurrently(tmp_path):
+    import threading
+    app = make_app(tmp_path)
+    # Each constructor blocks until all three are running at once; a sequential boot would time out
+    barrier = threading.Barrier(3, timeout=5)
+
+    def started(name):
+        def build(*args, **kwargs):
+            barrier.wait()
+            obj = MagicMock(name=name)
+            obj.collection.count.return_value = 0
+            return obj
+        return build
+
+    import importlib.util
+    real_find_spec = importlib.util.find_spec
+    with patch("ghost_agent.main.importlib.util.find_spec", side_effect=lambda name: True if name == "docker" else real_find_spec(name)), \
+         patch("ghost_agent.main.DockerSandbox", side_effect=started("sandbox")), \
+         patch("ghost_agent.main.ProfileMemory", side_effect=started("profile")), \
+         patch("ghost_agent.main.VectorMemory", side_effect=started("memory")), \
+         patch("ghost_agent.main.GhostAgent"):
+        async with lifespan(app):
+            ctx = app.state.context
+            assert ctx.sandbox_manager is not None and ctx.profile_memory is not None and ctx.memory_system is not None
+            ctx.sandbox_manager.ensure_running.assert_called_once()
@@ -1,6 +1,6 @@
 import pytest
 import re
-from ghost_agent.core.agent import extract_json_from_text
+from ghost_agent.core.agent import extract_json_from_text, _TOOL_CALL_RE
 
 def test_extract_json_with_markdown_and_filler():
     """Test extracting JSON wrapped in markdown with text around it."""
@@ -23,6 +23,12 @@ def test_extract_json_broken_brace():
     result = extract_json_from_text(text)
     assert result == {}
 
+def test_extract_json_raw_control_chars_fallback():
+    """orjson rejects raw newlines inside strings; the lenient stdlib fallback must still parse them."""
+    text = '{"code": "print(1)\nprint(2)"}'
+    result = extract_json_from_text(text)
+    assert result == {"code": "print(1)\nprint(2)"}
+
 def test_tool_call_scrubber_regex():
     """
     Simulate the handle_chat scrubber regex to ensure it removes
@@ -31,7 +37,7 @@ def test_tool_call_scrubber_regex():
     content = 'Here is the code. <tool_call> {"name": "execute"} </tool_call> Done.'
     
     # The regex used in GhostAgent.handle_chat
-    scrubbed = re.sub(r'<tool_call>.*?</tool_call>', '', content, flags=re.DOTALL | re.IGNORECASE).strip()
+    scrubbed = _TOOL_CALL_RE.sub('', content).strip()
     
     # Expected: "Here is the code.  Done." (Note: double space might remain if not handled, 
     # but the user asked to prove it erases the tags. Let's see exactly what strip() does to the ends, 
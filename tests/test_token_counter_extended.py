@@ -1,5 +1,6 @@
 import pytest
-from ghost_agent.utils.token_counter import estimate_tokens
+from ghost_agent.utils import token_counter
+from ghost_agent.utils.token_counter import estimate_tokens, estimate_tokens_cached, clear_token_cache
 
 def test_estimate_tokens_empty():
     assert estimate_tokens("") == 0
@@ -18,6 +19,18 @@ def test_estimate_tokens_special_chars():
     text = "Hello! @#% &*("
     assert estimate_tokens(text) > 0
 
+def test_estimate_tokens_cached_matches_and_memoizes():
+    clear_token_cache()
+    text = "cached message content " * 10
+    assert estimate_tokens_cached(text) == estimate_tokens(text)
+    estimate_tokens_cached(text)
+    assert token_counter._TOKEN_CACHE_STATS["hits"] == 1
+
+def test_estimate_tokens_cached_does_not_retain_text():
+    clear_token_cache()
+    estimate_tokens_cached("x" * 10_000)
+    assert all(isinstance(k, tuple) and all(isinstance(v, int) for v in k) for k in token_counter._TOKEN_CACHE)
+
 def test_estimate_tokens_list():
     # It accepts string or list of dicts (messages)
     msgs = [{"role": "user", "content": "hello"}]
@@ -25,3 +38,22 @@ def test_estimate_tokens_list():
     # checking impl... it takes `text: str`.
     # So we only test str.
     pass
+
+def test_registered_prefix_is_tokenized_once(monkeypatch):
+    from ghost_agent.core.prompts import persona_prefixes, get
+    prefix = persona_prefixes()[0]
+    monkeypatch.setattr(token_counter, "_STATIC_PREFIXES", {})
+    clear_token_cache()
+    token_counter.register_static_prefix(prefix)
+
+    encoded = []
+    real = token_counter.estimate_tokens
+    monkeypatch.setattr(token_counter, "estimate_tokens", lambda t: encoded.append(t) or real(t))
+    for user in range(3):
+        prompt = get("system") + f"\n\nPLAYBOOK for user {user}"
+        assert abs(estimate_tokens_cached(prompt) - real(prompt)) <= 1
+    # Only the per-request tails were encoded
+    assert len(encoded) == 3 and all(len(t) < 200 for t in encoded)
+
+    clear_token_cache()
+    assert token_counter._STATIC_PREFIXES == {prefix: None}
@@ -0,0 +1,42 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from ghost_agent.core.tool_cache import ToolResultCache
+
+def test_exact_match_ignores_whitespace_and_key_order():
+    cache = ToolResultCache()
+    assert cache.lookup("web_search", {"query": "Python 3.12  release notes"}) is None
+    cache.store("deep_research", {"query": "Python 3.12  release notes", "depth": 2}, "RESULT")
+    assert cache.lookup("deep_research", {"depth": 2, "query": "  Python 3.12 release\nnotes "}) == "RESULT"
+
+def test_near_miss_queries_do_not_match():
+    cache = ToolResultCache()
+    cache.store("web_search", {"query": "python 3.12 release date"}, "3.12 RESULT")
+    assert cache.lookup("web_search", {"query": "python 3.13 release date"}) is None
+    # Values keep their case: "US" and "us" are different searches
+    cache.store("web_search", {"query": "US inflation"}, "RESULT")
+    assert cache.lookup("web_search", {"query": "us inflation"}) is None
+    # Same arguments, different tool
+    assert cache.lookup("deep_research", {"query": "python 3.12 release date"}) is None
+
+def test_expired_entries_are_not_returned():
+    cache = ToolResultCache(ttl=-1)
+    cache.store("web_search", {"query": "python 3.12 release notes"}, "RESULT")
+    assert cache.lookup("web_search", {"query": "python 3.12 release notes"}) is None
+
+def test_oldest_entries_are_evicted():
+    cache = ToolResultCache(max_entries=2)
+    for q in ("a", "b", "c"):
+        cache.store("web_search", {"query": q}, q.upper())
+    assert cache.lookup("web_search", {"query": "a"}) is None
+    assert cache.lookup("web_search", {"query": "c"}) == "C"
+
+@pytest.mark.asyncio
+async def test_agent_cache_miss_runs_the_tool_without_embedding_first():
+    from ghost_agent.core.agent import GhostAgent
+    agent = GhostAgent(MagicMock())
+    agent.available_tools["web_search"] = AsyncMock(return_value="FRESH")
+    assert await agent._run_cacheable_tool("web_search", {"query": "python 3.12"}) == "FRESH"
+    assert await agent._run_cacheable_tool("web_search", {"query": "python 3.12"}) == "FRESH"
+    assert await agent._run_cacheable_tool("web_search", {"query": "python 3.13"}) == "FRESH"
+    assert agent.available_tools["web_search"].await_count == 2
+    agent.context.llm_client.get_embeddings.assert_not_called()